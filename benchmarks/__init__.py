@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+# Este archivo hace que Python trate el directorio como un paquete
@@ -0,0 +1,77 @@
+# benchmarks/bench_ingest.py
+import os
+import queue
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.build_database import build_database
+from src.api.database import DatabaseManager
+from src.api.database.writer import prepare_detection_batch
+
+
+def make_batch(prefix: str, n_images: int, detections_per_image: int):
+    """
+    Lote sintetico con el formato de POST /api/detections.
+    """
+    return prepare_detection_batch({
+        "images": [
+            {
+                "filename": f"{prefix}_{i}.jpg",
+                "gps_center_lat": 9.9351,
+                "gps_center_lon": -84.0854,
+                "detections": [
+                    {"species_id": (j % 5) + 1, "bbox": [0.5, 0.5, 0.05, 0.05], "confidence": 0.8}
+                    for j in range(detections_per_image)
+                ],
+            }
+            for i in range(n_images)
+        ]
+    })
+
+
+def run_ingest_benchmarks(batch_sizes=(1, 10, 100), total_images: int = 2000,
+                          detections_per_image: int = 50, verbose: bool = True):
+    """
+    Mide el throughput de DetectionWriter (modo durable) segun el tamano de lote.
+    Usa una base de 10k arboles temporal para no modificar las bases de benchmarks.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for batch_size in batch_sizes:
+            db_path = os.path.join(tmp_dir, f"ingest_{batch_size}.db")
+            build_database(db_path, 10_000, verbose=False)
+            db = DatabaseManager(db_path)
+            batches = [
+                make_batch(f"b{batch_size}_{n}", batch_size, detections_per_image)
+                for n in range(max(1, total_images // batch_size))
+            ]
+
+            start = time.perf_counter()
+            tickets = []
+            for batch in batches:
+                # Igual que un cliente ante un 429: esperar y reintentar
+                while True:
+                    try:
+                        tickets.append(db.detections.submit(batch))
+                        break
+                    except queue.Full:
+                        time.sleep(0.001)
+            for ticket in tickets:
+                ticket.wait()
+            elapsed = time.perf_counter() - start
+            db.detections.close()
+
+            detections = sum(ticket.result["detections"] for ticket in tickets)
+            results[f"batch={batch_size}"] = {
+                "batches": len(batches),
+                "detections": detections,
+                "seconds": round(elapsed, 4),
+                "detections_per_s": round(detections / elapsed, 1),
+            }
+            if verbose:
+                print(f"   batch={batch_size:<6} {detections / elapsed:>12,.0f} detecciones/s")
+
+    return results
@@ -0,0 +1,152 @@
+# benchmarks/bench_queries.py
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.api.database import DatabaseManager
+from src.api.geometry import parse_geojson_polygons
+
+
+def summarize(latencies_s):
+    """
+    Resume una lista de latencias (segundos) en milisegundos.
+    """
+    latencies_ms = np.asarray(latencies_s) * 1000.0
+    return {
+        "iterations": int(latencies_ms.size),
+        "mean_ms": round(float(latencies_ms.mean()), 4),
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 4),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 4),
+        "min_ms": round(float(latencies_ms.min()), 4),
+        "max_ms": round(float(latencies_ms.max()), 4),
+        "ops_per_s": round(float(latencies_ms.size / (latencies_ms.sum() / 1000.0)), 2),
+    }
+
+
+def time_call(fn, make_args, max_iterations: int, time_budget_s: float, warmup: int = 2):
+    """
+    Ejecuta fn(*make_args()) hasta max_iterations veces o hasta agotar time_budget_s.
+    Siempre se mide al menos 3 veces para que los percentiles tengan sentido.
+    """
+    for _ in range(warmup):
+        fn(*make_args())
+
+    latencies = []
+    deadline = time.perf_counter() + time_budget_s
+    while len(latencies) < max_iterations:
+        args = make_args()
+        start = time.perf_counter()
+        fn(*args)
+        latencies.append(time.perf_counter() - start)
+        if len(latencies) >= 3 and time.perf_counter() > deadline:
+            break
+    return summarize(latencies)
+
+
+def query_cases(db: DatabaseManager, rng: random.Random):
+    """
+    Casos de benchmark: nombre -> (funcion, generador de argumentos).
+    Los argumentos se sortean en cada iteracion para no medir solo la cache.
+    """
+    bounds = db.connection.execute_query("""
+        SELECT MIN(tree_id) AS min_id, MAX(tree_id) AS max_id,
+               MIN(gps_lat) AS lat_min, MAX(gps_lat) AS lat_max,
+               MIN(gps_lon) AS lon_min, MAX(gps_lon) AS lon_max
+        FROM trees
+    """)[0]
+    species_ids = [row["species_id"] for row in db.connection.execute_query("SELECT species_id FROM species")]
+    max_image_id = db.connection.execute_scalar("SELECT MAX(image_id) FROM images")
+
+    def random_area(size_deg=0.002):
+        lat = rng.uniform(bounds["lat_min"], bounds["lat_max"] - size_deg)
+        lon = rng.uniform(bounds["lon_min"], bounds["lon_max"] - size_deg)
+        return (lat, lat + size_deg, lon, lon + size_deg)
+
+    def random_polygon():
+        return (parse_geojson_polygons(random_hexagon(rng, random_area(0.01))),)
+
+    return {
+        "TreeQueries.get_total_trees_count": (
+            db.trees.get_total_trees_count, lambda: ()),
+        "TreeQueries.get_trees_paginated": (
+            db.trees.get_trees_paginated, lambda: (rng.randint(1, 20), 50)),
+        "TreeQueries.get_tree_by_id": (
+            db.trees.get_tree_by_id, lambda: (rng.randint(bounds["min_id"], bounds["max_id"]),)),
+        "TreeQueries.get_trees_by_species": (
+            db.trees.get_trees_by_species, lambda: (rng.choice(species_ids), rng.randint(1, 20), 50)),
+        "TreeQueries.get_trees_in_area": (
+            db.trees.get_trees_in_area, random_area),
+        "TreeQueries.search_trees[min_confidence+height]": (
+            db.trees.search_trees,
+            lambda: ({"min_confidence": rng.uniform(0.85, 0.98), "min_height": 10.0, "max_height": 25.0},
+                     "-confidence", 1, 50)),
+        "TreeQueries.search_trees[species+image]": (
+            db.trees.search_trees,
+            lambda: ({"species_ids": rng.sample(species_ids, 2), "image_id": rng.randint(1, max_image_id)},
+                     "height", 1, 50)),
+        "TreeQueries.get_trees_within[page=1]": (
+            db.trees.get_trees_within, random_polygon),
+        "TreeQueries.count_trees_within": (
+            db.trees.count_trees_within, random_polygon),
+        "TreeQueries.get_stats_within": (
+            db.trees.get_stats_within, random_polygon),
+        "ImageQueries.get_images_covering_point": (
+            db.images.get_images_covering_point,
+            lambda: (rng.uniform(bounds["lat_min"], bounds["lat_max"]),
+                     rng.uniform(bounds["lon_min"], bounds["lon_max"]))),
+        "ImageQueries.get_images_covering_area": (
+            db.images.get_images_covering_area, random_area),
+        "ClusterIndex.get_clusters[zoom=14]": (
+            db.clusters.get_clusters,
+            lambda: (14,) + _viewport(random_area(0.03))),
+        "StatisticsQueries.get_statistics": (
+            db.statistics.get_statistics, lambda: ()),
+    }
+
+
+def random_hexagon(rng: random.Random, area):
+    """
+    Poligono GeoJSON irregular de 6 vertices inscrito en (lat_min, lat_max, lon_min, lon_max).
+    """
+    lat_min, lat_max, lon_min, lon_max = area
+    center_lat, center_lon = (lat_min + lat_max) / 2, (lon_min + lon_max) / 2
+    ring = []
+    for k in range(6):
+        angle = k * np.pi / 3
+        radius = rng.uniform(0.6, 1.0)
+        ring.append([center_lon + radius * (lon_max - lon_min) / 2 * np.cos(angle),
+                     center_lat + radius * (lat_max - lat_min) / 2 * np.sin(angle)])
+    return {"type": "Polygon", "coordinates": [ring]}
+
+
+def _viewport(area):
+    """
+    Convierte (lat_min, lat_max, lon_min, lon_max) al orden de get_clusters.
+    """
+    lat_min, lat_max, lon_min, lon_max = area
+    return (lon_min, lat_min, lon_max, lat_max)
+
+
+def run_query_benchmarks(db_path: str, max_iterations: int = 200, time_budget_s: float = 5.0,
+                         seed: int = 42, verbose: bool = True):
+    """
+    Micro-benchmark en proceso de cada metodo de TreeQueries y StatisticsQueries.
+    Retorna un diccionario nombre -> estadisticas de latencia.
+    """
+    db = DatabaseManager(db_path)
+    rng = random.Random(seed)
+    results = {}
+
+    for name, (fn, make_args) in query_cases(db, rng).items():
+        results[name] = time_call(fn, make_args, max_iterations, time_budget_s)
+        if verbose:
+            stats = results[name]
+            print(f"   {name:<50} p50={stats['p50_ms']:>10.3f}ms  "
+                  f"p99={stats['p99_ms']:>10.3f}ms  n={stats['iterations']}")
+
+    return results
@@ -0,0 +1,182 @@
+# benchmarks/build_database.py
+import argparse
+import hashlib
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.api.database.clusters import ClusterIndex
+from src.api.database.connection import DatabaseConnection
+from src.api.database import schema
+from src.api.database.schema import TABLES, ensure_indexes
+
+# Mismos parametros que el notebook v2 (San Jose, Costa Rica)
+BASE_LAT = 9.9351
+BASE_LON = -84.0854
+METERS_PER_PIXEL = 0.78
+IMAGE_SIZE = 640
+IMAGE_SPACING_DEG = 0.009
+TREES_PER_IMAGE = 100
+CHUNK_SIZE = 100_000
+
+SPECIES = [
+    (1, "Ceiba", "Ceiba pentandra", 50.0, 25.0, "Arbol gigante tropical"),
+    (2, "Guanacaste", "Enterolobium cyclocarpum", 35.0, 30.0, "Arbol nacional de Costa Rica"),
+    (3, "Almendro", "Dipteryx panamensis", 40.0, 20.0, "Madera dura"),
+    (4, "Roble", "Quercus costaricensis", 30.0, 15.0, "Comun en zonas altas"),
+    (5, "Laurel", "Cordia alliodora", 25.0, 12.0, "Madera de construccion"),
+]
+
+# Tamanos con nombre para la linea de comandos
+SIZES = {
+    "10k": 10_000,
+    "1m": 1_000_000,
+    "10m": 10_000_000,
+}
+
+
+def parse_size(value: str) -> int:
+    """
+    Convierte '10k', '1m', '10m' o un entero en cantidad de arboles.
+    """
+    value = value.strip().lower()
+    if value in SIZES:
+        return SIZES[value]
+    return int(value)
+
+
+def schema_hash() -> str:
+    """
+    Hash corto de las definiciones del esquema (tablas, indices, huellas y clusters).
+    Identifica las bases sinteticas para no reutilizar una creada con otro esquema.
+    """
+    statements = (schema.TABLES + schema.INDEXES + schema.REDUNDANT_INDEXES
+                  + [schema.IMAGE_FOOTPRINTS_TABLE] + schema.IMAGE_FOOTPRINT_TRIGGERS
+                  + [schema.TREE_CLUSTERS_TABLE])
+    return hashlib.sha256("\n".join(statements).encode()).hexdigest()[:12]
+
+
+def build_database(db_path: str, n_trees: int, seed: int = 42, verbose: bool = True):
+    """
+    Crea una base de datos sintetica con n_trees arboles.
+    Los datos se generan con NumPy por bloques y los indices se crean al final,
+    que es mucho mas rapido que mantenerlos durante la insercion.
+    """
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    for statement in TABLES:
+        conn.execute(statement)
+
+    conn.executemany("""
+        INSERT INTO species
+        (species_id, common_name, scientific_name, average_height_m, crown_diameter_m, description)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, SPECIES)
+
+    # 1. Imagenes en una cuadricula de ~1km
+    n_images = max(1, n_trees // TREES_PER_IMAGE)
+    grid_size = int(np.ceil(np.sqrt(n_images)))
+    index = np.arange(n_images)
+    center_lat = BASE_LAT + (index // grid_size - grid_size / 2) * IMAGE_SPACING_DEG
+    center_lon = BASE_LON + (index % grid_size - grid_size / 2) * IMAGE_SPACING_DEG
+    coverage = (IMAGE_SIZE * METERS_PER_PIXEL) ** 2
+    processing_day = rng.integers(0, 365, n_images)
+
+    conn.executemany("""
+        INSERT INTO images
+        (image_id, filename, width, height, gps_center_lat, gps_center_lon,
+         meters_per_pixel, coverage_area_m2, processing_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, date('2025-01-01', '+' || ? || ' days'))
+    """, (
+        (int(i) + 1, f"tile_{int(i):07d}.jpg", IMAGE_SIZE, IMAGE_SIZE,
+         float(lat), float(lon), METERS_PER_PIXEL, coverage, int(day))
+        for i, lat, lon, day in zip(index, center_lat, center_lon, processing_day)
+    ))
+
+    # 2. Arboles por bloques
+    species_height = np.array([s[3] for s in SPECIES])
+    species_crown = np.array([s[4] for s in SPECIES])
+    half_extent_deg = IMAGE_SIZE * METERS_PER_PIXEL / 2 / 111320
+
+    for offset in range(0, n_trees, CHUNK_SIZE):
+        size = min(CHUNK_SIZE, n_trees - offset)
+        image_idx = rng.integers(0, n_images, size)
+        species_idx = rng.integers(0, len(SPECIES), size)
+        bbox_x = rng.uniform(0.02, 0.98, size)
+        bbox_y = rng.uniform(0.02, 0.98, size)
+        bbox_w = rng.uniform(0.02, 0.12, size)
+        bbox_h = rng.uniform(0.02, 0.12, size)
+
+        lat = center_lat[image_idx] - (bbox_y - 0.5) * 2 * half_extent_deg
+        lon = center_lon[image_idx] + (bbox_x - 0.5) * 2 * half_extent_deg / np.cos(np.radians(lat))
+        confidence = rng.uniform(0.25, 0.99, size)
+        height = np.clip(rng.normal(species_height[species_idx] * 0.6, 4.0), 2.0, None)
+        crown = np.clip(rng.normal(species_crown[species_idx] * 0.6, 2.5), 1.0, None)
+        day = processing_day[image_idx]
+        seconds = rng.integers(0, 86400, size)
+
+        rows = zip(
+            (image_idx + 1).tolist(), (species_idx + 1).tolist(),
+            bbox_x.tolist(), bbox_y.tolist(), bbox_w.tolist(), bbox_h.tolist(),
+            lat.tolist(), lon.tolist(), confidence.tolist(), height.tolist(), crown.tolist(),
+            day.tolist(), seconds.tolist()
+        )
+        conn.executemany("""
+            INSERT INTO trees
+            (image_id, species_id, bbox_x_center, bbox_y_center, bbox_width, bbox_height,
+             gps_lat, gps_lon, detection_confidence, estimated_height_m, estimated_crown_diameter_m,
+             detection_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
+                    strftime('%Y-%m-%dT%H:%M:%S', '2025-01-01', '+' || ? || ' days', '+' || ? || ' seconds'))
+        """, rows)
+
+        if verbose:
+            print(f"   {offset + size:,}/{n_trees:,} arboles insertados")
+
+    # 3. Indices, conteo por imagen y clusters
+    if verbose:
+        print("   Creando indices...")
+    ensure_indexes(conn)
+    conn.execute("""
+        UPDATE images
+        SET total_trees_detected = (
+            SELECT COUNT(*) FROM trees WHERE trees.image_id = images.image_id
+        )
+    """)
+    conn.commit()
+    conn.close()
+
+    if verbose:
+        print("   Construyendo indice de clusters...")
+    ClusterIndex(DatabaseConnection(db_path)).build()
+
+    elapsed = time.perf_counter() - start
+    if verbose:
+        print(f"   Base de datos lista en {elapsed:.1f}s: {db_path}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crear bases de datos sinteticas para benchmarks")
+    parser.add_argument("size", help="Cantidad de arboles: 10k, 1m, 10m o un entero")
+    parser.add_argument("output", help="Ruta del archivo SQLite a crear")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    build_database(args.output, parse_size(args.size), seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
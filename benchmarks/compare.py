@@ -0,0 +1,69 @@
+# benchmarks/compare.py
+"""
+Compara dos archivos de resultados de run_benchmarks y marca regresiones.
+
+Uso:
+    python -m benchmarks.compare base.json nuevo.json --threshold 0.10
+"""
+import argparse
+import json
+
+
+def compare_results(base: dict, new: dict, threshold: float = 0.10):
+    """
+    Compara las latencias p50 de ambos resultados.
+    Retorna una lista de filas (dataset, medicion, base_ms, nuevo_ms, cambio, regresion).
+    """
+    rows = []
+    for size, new_dataset in new.get("datasets", {}).items():
+        base_dataset = base.get("datasets", {}).get(size)
+        if not base_dataset:
+            continue
+
+        pairs = []
+        for name, stats in new_dataset.get("queries", {}).items():
+            pairs.append((name, base_dataset.get("queries", {}).get(name), stats))
+        for workers, endpoints in new_dataset.get("load", {}).items():
+            for name, stats in endpoints.items():
+                base_stats = base_dataset.get("load", {}).get(workers, {}).get(name)
+                pairs.append((f"[{workers}] {name}", base_stats, stats))
+
+        for name, base_stats, new_stats in pairs:
+            if not base_stats or "p50_ms" not in base_stats or "p50_ms" not in new_stats:
+                continue
+            change = (new_stats["p50_ms"] - base_stats["p50_ms"]) / base_stats["p50_ms"] \
+                if base_stats["p50_ms"] else 0.0
+            rows.append((size, name, base_stats["p50_ms"], new_stats["p50_ms"], change, change > threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comparar resultados de benchmarks")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Aumento relativo de p50 considerado regresion (default: 0.10)")
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    print(f"Base:  {base['environment']['commit']}  Nuevo: {new['environment']['commit']}")
+    base_schema = base['environment'].get('schema', 'desconocido')
+    new_schema = new['environment'].get('schema', 'desconocido')
+    if base_schema != new_schema:
+        print(f"Esquema distinto: {base_schema} -> {new_schema}")
+    rows = compare_results(base, new, args.threshold)
+    for size, name, base_ms, new_ms, change, regression in rows:
+        flag = "REGRESION" if regression else ""
+        print(f"{size:>4} {name:<60} {base_ms:>10.3f}ms -> {new_ms:>10.3f}ms  {change:+7.1%} {flag}")
+
+    regressions = sum(1 for row in rows if row[5])
+    print(f"\n{regressions} regresiones de {len(rows)} mediciones")
+    raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
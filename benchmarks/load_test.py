@@ -0,0 +1,261 @@
+# benchmarks/load_test.py
+import http.client
+import itertools
+import json
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(PROJECT_ROOT)
+
+from benchmarks.bench_queries import random_hexagon, summarize
+from benchmarks.build_database import build_database
+
+# Base de datos sobre la que se mide la ingesta (una copia nueva por cada
+# cantidad de workers, para no hacer crecer las bases cacheadas de lectura)
+INGEST_BASE_TREES = 10_000
+INGEST_IMAGES_PER_REQUEST = 5
+INGEST_DETECTIONS_PER_IMAGE = 20
+
+
+def endpoint_urls(rng: random.Random, max_tree_id: int):
+    """
+    Endpoints medidos: nombre -> funcion que genera una URL (GET) o una
+    tupla (metodo, URL, cuerpo JSON) por peticion.
+    """
+    return {
+        "/api/info": lambda: "/api/info",
+        "/api/stats": lambda: "/api/stats",
+        "/api/species": lambda: "/api/species",
+        "/api/images": lambda: "/api/images",
+        "/api/trees": lambda: f"/api/trees?page={rng.randint(1, 20)}&per_page=50",
+        "/api/trees?filters": lambda: (
+            f"/api/trees?min_confidence={rng.uniform(0.85, 0.98):.3f}"
+            f"&min_height=10&max_height=25&sort=-confidence&per_page=50"
+        ),
+        "/api/trees/{id}": lambda: f"/api/trees/{rng.randint(1, max_tree_id)}",
+        "/api/trees/species/{id}": lambda: f"/api/trees/species/{rng.randint(1, 5)}?page={rng.randint(1, 20)}",
+        "/api/trees/area": lambda: _random_area_url(rng),
+        "/api/trees/clusters": lambda: _random_clusters_url(rng),
+        "POST /api/trees/within": lambda: _random_within_request(rng, "rows"),
+        "POST /api/trees/within?count": lambda: _random_within_request(rng, "count"),
+        "POST /api/trees/within?stats": lambda: _random_within_request(rng, "stats"),
+        "/api/images/covering": lambda: (
+            f"/api/images/covering?lat={9.9351 + rng.uniform(-0.05, 0.05)}"
+            f"&lon={-84.0854 + rng.uniform(-0.05, 0.05)}"
+        ),
+    }
+
+
+def _random_area_url(rng: random.Random):
+    lat = 9.9351 + rng.uniform(-0.05, 0.05)
+    lon = -84.0854 + rng.uniform(-0.05, 0.05)
+    return f"/api/trees/area?lat_min={lat}&lat_max={lat + 0.002}&lon_min={lon}&lon_max={lon + 0.002}"
+
+
+def _random_clusters_url(rng: random.Random):
+    lat = 9.9351 + rng.uniform(-0.05, 0.05)
+    lon = -84.0854 + rng.uniform(-0.05, 0.05)
+    return f"/api/trees/clusters?zoom=14&bbox={lon},{lat},{lon + 0.03},{lat + 0.03}"
+
+
+def _random_within_request(rng: random.Random, mode: str):
+    lat = 9.9351 + rng.uniform(-0.05, 0.05)
+    lon = -84.0854 + rng.uniform(-0.05, 0.05)
+    geometry = random_hexagon(rng, (lat, lat + 0.01, lon, lon + 0.01))
+    return "POST", "/api/trees/within?per_page=50", {"mode": mode, "geometry": geometry}
+
+
+def ingest_requests(rng: random.Random):
+    """
+    Generador de peticiones POST /api/detections?wait=true con filenames unicos
+    (un prefijo por ejecucion y un contador), para que ningun lote se omita como repetido.
+    """
+    run_id = uuid.uuid4().hex[:8]
+    counter = itertools.count()
+
+    def make_request():
+        n = next(counter)
+        images = []
+        for k in range(INGEST_IMAGES_PER_REQUEST):
+            images.append({
+                "filename": f"load_{run_id}_{n}_{k}.jpg",
+                "gps_center_lat": 9.9351 + rng.uniform(-0.05, 0.05),
+                "gps_center_lon": -84.0854 + rng.uniform(-0.05, 0.05),
+                "detections": [
+                    {"species_id": rng.randint(1, 5),
+                     "bbox": [rng.random(), rng.random(), 0.05, 0.05],
+                     "confidence": rng.uniform(0.5, 1.0)}
+                    for _ in range(INGEST_DETECTIONS_PER_IMAGE)
+                ],
+            })
+        return "POST", "/api/detections?wait=true", {"images": images}
+
+    return make_request
+
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(db_path: str, workers: int, port: int, timeout_s: float = 60.0):
+    """
+    Arranca la aplicacion (run:app) bajo Gunicorn apuntando a db_path.
+    Espera a que /api/info responda antes de retornar el proceso.
+    """
+    env = dict(os.environ, TREE_DB_PATH=os.path.abspath(db_path))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--workers", str(workers),
+         "--bind", f"127.0.0.1:{port}", "--timeout", "120", "--log-level", "warning", "run:app"],
+        cwd=PROJECT_ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Gunicorn termino al arrancar: {process.stderr.read().decode()}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/api/info")
+            if conn.getresponse().status == 200:
+                conn.close()
+                return process
+        except OSError:
+            time.sleep(0.2)
+    stop_gunicorn(process)
+    raise RuntimeError("Gunicorn no respondio a tiempo")
+
+
+def stop_gunicorn(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def load_endpoint(port: int, make_url, concurrency: int, duration_s: float):
+    """
+    Genera carga concurrente (un hilo por cliente) contra un endpoint durante duration_s.
+    Retorna throughput, latencias y cantidad de errores.
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration_s
+
+    def client():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        local_latencies = []
+        local_errors = 0
+        while time.perf_counter() < deadline:
+            request = make_url()
+            method, url, body = ("GET", request, None) if isinstance(request, str) else request
+            start = time.perf_counter()
+            try:
+                if body is None:
+                    conn.request(method, url)
+                else:
+                    conn.request(method, url, body=json.dumps(body),
+                                 headers={"Content-Type": "application/json"})
+                response = conn.getresponse()
+                response.read()
+                # 201 (ingesta confirmada) tambien es exito; 202/429 no
+                if response.status not in (200, 201):
+                    local_errors += 1
+                    continue
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                conn.close()
+                continue
+            local_latencies.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    result = {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+    }
+    if latencies:
+        stats = summarize(latencies)
+        result.update({key: stats[key] for key in ("mean_ms", "p50_ms", "p99_ms", "max_ms")})
+    return result
+
+
+def run_load_tests(db_path: str, worker_counts=(1, 2, 4), concurrency: int = 16,
+                   duration_s: float = 10.0, seed: int = 42, verbose: bool = True):
+    """
+    Ejecuta la carga contra cada endpoint con cada cantidad de workers de Gunicorn.
+    La ingesta (POST /api/detections) se mide aparte, sobre una copia de una base
+    pequena, con todos los workers compartiendo el bloqueo <db>-writer.lock.
+    Retorna {"workers=N": {endpoint: resultados}}.
+    """
+    conn = sqlite3.connect(db_path)
+    max_tree_id = conn.execute("SELECT MAX(tree_id) FROM trees").fetchone()[0] or 1
+    conn.close()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ingest_base = os.path.join(tmp_dir, "ingest_base.db")
+        build_database(ingest_base, INGEST_BASE_TREES, seed=seed, verbose=False)
+
+        for workers in worker_counts:
+            rng = random.Random(seed)
+            key = f"workers={workers}"
+            results[key] = {}
+
+            port = _free_port()
+            process = start_gunicorn(db_path, workers, port)
+            try:
+                for name, make_url in endpoint_urls(rng, max_tree_id).items():
+                    results[key][name] = load_endpoint(port, make_url, concurrency, duration_s)
+                    _print_result(key, name, results[key][name], verbose)
+            finally:
+                stop_gunicorn(process)
+
+            ingest_db = os.path.join(tmp_dir, f"ingest_{workers}.db")
+            shutil.copy(ingest_base, ingest_db)
+            port = _free_port()
+            process = start_gunicorn(ingest_db, workers, port)
+            try:
+                name = "POST /api/detections?wait=true"
+                results[key][name] = load_endpoint(port, ingest_requests(rng), concurrency, duration_s)
+                results[key][name]["detections_per_s"] = round(
+                    results[key][name]["throughput_rps"]
+                    * INGEST_IMAGES_PER_REQUEST * INGEST_DETECTIONS_PER_IMAGE, 2
+                )
+                _print_result(key, name, results[key][name], verbose)
+            finally:
+                stop_gunicorn(process)
+
+    return results
+
+
+def _print_result(key: str, name: str, stats: dict, verbose: bool):
+    if verbose:
+        print(f"   [{key}] {name:<28} {stats['throughput_rps']:>9.1f} req/s  "
+              f"p50={stats.get('p50_ms', 0):>9.2f}ms  p99={stats.get('p99_ms', 0):>9.2f}ms  "
+              f"errores={stats['errors']}")
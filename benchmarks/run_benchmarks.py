@@ -0,0 +1,144 @@
+# benchmarks/run_benchmarks.py
+"""
+Suite de benchmarks reproducible del API.
+
+Uso (desde la raiz del proyecto):
+    python -m benchmarks.run_benchmarks --sizes 10k,1m,10m --workers 1,2,4
+    (incluye el throughput de ingesta de POST /api/detections segun el tamano de lote)
+    python -m benchmarks.compare benchmarks/results/A.json benchmarks/results/B.json
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from benchmarks.bench_queries import run_query_benchmarks
+from benchmarks.bench_ingest import run_ingest_benchmarks
+from benchmarks.build_database import build_database, parse_size, schema_hash
+from benchmarks.load_test import run_load_tests
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def environment_info():
+    """
+    Datos del entorno para poder comparar resultados entre maquinas y commits.
+    """
+    import numpy
+    return {
+        "commit": git_commit(),
+        "schema": schema_hash(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "numpy": numpy.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def get_database(size_label: str, data_dir: str, seed: int, rebuild: bool):
+    """
+    Retorna la ruta de la base de datos sintetica para un tamano, creandola si hace falta.
+    Las bases se reutilizan entre ejecuciones porque las grandes tardan minutos en crearse;
+    el nombre incluye el hash del esquema, asi un commit con otros indices crea la suya.
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"trees_{size_label}_seed{seed}_{schema_hash()}.db")
+    build_seconds = None
+    if rebuild or not os.path.exists(path):
+        print(f"Creando base de datos de {size_label} arboles...")
+        build_seconds = round(build_database(path, parse_size(size_label), seed=seed), 2)
+    return path, build_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de consultas y carga del API")
+    parser.add_argument("--sizes", default="10k,1m,10m",
+                        help="Tamanos de base de datos separados por coma (default: 10k,1m,10m)")
+    parser.add_argument("--workers", default="1,2,4",
+                        help="Cantidades de workers de Gunicorn separadas por coma (default: 1,2,4)")
+    parser.add_argument("--concurrency", type=int, default=16,
+                        help="Clientes concurrentes del generador de carga")
+    parser.add_argument("--duration", type=float, default=10.0,
+                        help="Segundos de carga por endpoint")
+    parser.add_argument("--iterations", type=int, default=200,
+                        help="Iteraciones maximas por metodo en el micro-benchmark")
+    parser.add_argument("--time-budget", type=float, default=5.0,
+                        help="Segundos maximos por metodo en el micro-benchmark")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", default=os.path.join(BENCH_DIR, "data"))
+    parser.add_argument("--output", default=None,
+                        help="Archivo JSON de salida (default: benchmarks/results/<commit>-<fecha>.json)")
+    parser.add_argument("--rebuild", action="store_true", help="Regenerar las bases de datos")
+    parser.add_argument("--skip-load", action="store_true", help="Solo micro-benchmarks en proceso")
+    parser.add_argument("--skip-ingest", action="store_true", help="Omitir el benchmark de ingesta")
+    args = parser.parse_args()
+
+    sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+    workers = [int(w) for w in args.workers.split(",") if w.strip()]
+
+    results = {
+        "environment": environment_info(),
+        "config": {
+            "sizes": sizes,
+            "workers": workers,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "iterations": args.iterations,
+            "time_budget_s": args.time_budget,
+            "seed": args.seed,
+        },
+        "datasets": {},
+    }
+
+    for size in sizes:
+        db_path, build_seconds = get_database(size, args.data_dir, args.seed, args.rebuild)
+        dataset = {"build_seconds": build_seconds}
+
+        print(f"\nMicro-benchmarks de consultas ({size})")
+        dataset["queries"] = run_query_benchmarks(
+            db_path, max_iterations=args.iterations, time_budget_s=args.time_budget, seed=args.seed
+        )
+
+        if not args.skip_load:
+            print(f"\nPrueba de carga con Gunicorn ({size})")
+            dataset["load"] = run_load_tests(
+                db_path, worker_counts=workers, concurrency=args.concurrency,
+                duration_s=args.duration, seed=args.seed
+            )
+
+        results["datasets"][size] = dataset
+
+    if not args.skip_ingest:
+        print("\nIngesta con DetectionWriter (group commit)")
+        results["ingest"] = run_ingest_benchmarks()
+
+    output = args.output
+    if output is None:
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(BENCH_DIR, "results", f"{results['environment']['commit']}-{stamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResultados guardados en: {output}")
+
+
+if __name__ == "__main__":
+    main()
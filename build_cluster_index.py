@@ -0,0 +1,31 @@
+# build_cluster_index.py
+import os
+import sys
+import time
+
+# Agregar el directorio src al path para imports
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from src.api.database import DatabaseManager
+
+
+def build_cluster_index():
+    """
+    Construir (o reconstruir) el indice de clusters por zoom de /api/trees/clusters.
+    Despues de construirlo, la ingesta por /api/detections lo mantiene actualizado.
+    """
+    db = DatabaseManager()
+
+    print("Construyendo indice de clusters...")
+    start = time.perf_counter()
+    rows_per_zoom = db.clusters.build()
+    elapsed = time.perf_counter() - start
+
+    print("\nFILAS POR ZOOM:")
+    for zoom, rows in sorted(rows_per_zoom.items()):
+        print(f"   - Zoom {zoom:>2}: {rows}")
+    print(f"\nIndice construido en {elapsed:.1f}s: {db.connection.db_path}")
+
+
+if __name__ == "__main__":
+    build_cluster_index()
@@ -0,0 +1,41 @@
+# migrate.py
+import os
+import sys
+import time
+
+# Agregar el directorio src al path para imports
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from src.api.database.connection import DatabaseConnection
+from src.api.database.schema import ensure_indexes, missing_schema_objects
+
+
+def migrate():
+    """
+    Crear los indices, el indice de huellas de imagenes y la tabla de clusters
+    que falten en la base de datos (TREE_DB_PATH o src/tree_detection.db),
+    y eliminar los indices simples que cubren los compuestos.
+    Ejecutar una vez con la API detenida: en bases grandes crear los indices
+    bloquea las escrituras durante varios segundos.
+    """
+    connection = DatabaseConnection()
+
+    with connection.get_connection() as conn:
+        missing = missing_schema_objects(conn)
+        if not missing:
+            print(f"El esquema ya esta al dia: {connection.db_path}")
+            return
+
+        print("Actualizando objetos del esquema:")
+        for name in missing:
+            print(f"   - {name}")
+
+        start = time.perf_counter()
+        ensure_indexes(conn)
+        elapsed = time.perf_counter() - start
+
+    print(f"\nEsquema actualizado en {elapsed:.1f}s: {connection.db_path}")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -1,13 +1,26 @@
 # src/api/database/__init__.py
+from .clusters import ClusterIndex
 from .connection import DatabaseConnection
 from .queries import SpeciesQueries, TreeQueries, ImageQueries, StatisticsQueries
+from .schema import missing_schema_objects
+from .writer import DetectionWriter
 
 class DatabaseManager:
     """Facade para acceder a todas las funcionalidades de la base de datos"""
     
     def __init__(self, db_path: str = None):
         self.connection = DatabaseConnection(db_path)
+        # Solo se verifica el esquema: crear indices toma el bloqueo de escritura
+        # y cada worker de Gunicorn crea su propio DatabaseManager al importar routes.
+        with self.connection.get_connection() as conn:
+            self.missing_schema = missing_schema_objects(conn)
+        if self.missing_schema:
+            print(f"Advertencia: esquema desactualizado ({', '.join(self.missing_schema)}). "
+                  f"Ejecutar migrate.py")
         self.species = SpeciesQueries(self.connection)
         self.trees = TreeQueries(self.connection)
         self.images = ImageQueries(self.connection)
-        self.statistics = StatisticsQueries(self.connection)
\ No newline at end of file
+        self.statistics = StatisticsQueries(self.connection)
+        self.clusters = ClusterIndex(self.connection)
+        self.detections = DetectionWriter(self.connection)
+        self.detections.add_commit_hook(self.clusters.refresh_for_batches)
\ No newline at end of file
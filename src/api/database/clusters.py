@@ -0,0 +1,266 @@
+# src/api/database/clusters.py
+import sqlite3
+
+import numpy as np
+
+from .connection import DatabaseConnection
+from .schema import TREE_CLUSTERS_TABLE
+from ..geometry import lonlat_to_mercator, mercator_to_lonlat
+
+# Zoom mas detallado del indice; en zooms mayores se sirve este nivel
+MAX_CLUSTER_ZOOM = 16
+# 2^2 = 4x4 celdas por tile (celdas de 64 px en tiles de 256 px)
+CELL_BITS = 2
+# Maximo de celdas que puede cubrir una consulta; si el bbox es mayor se sube de nivel
+MAX_FEATURES = 300
+
+# Empaquetado de (cell_x, cell_y, species_id) en un entero de 64 bits
+_AXIS_BITS = MAX_CLUSTER_ZOOM + CELL_BITS
+_SPECIES_BITS = 20
+_AXIS_MASK = (1 << _AXIS_BITS) - 1
+_SPECIES_MASK = (1 << _SPECIES_BITS) - 1
+
+
+def point_cells(lon, lat, zoom: int):
+    """
+    Celda (cell_x, cell_y) de cada punto en el nivel de zoom dado.
+    """
+    x, y = lonlat_to_mercator(lon, lat)
+    cells_per_axis = 1 << (zoom + CELL_BITS)
+    return (np.floor(x * cells_per_axis).astype(np.int64),
+            np.floor(y * cells_per_axis).astype(np.int64))
+
+
+def _pack(cell_x, cell_y, species_id):
+    return (cell_x << (_AXIS_BITS + _SPECIES_BITS)) | (cell_y << _SPECIES_BITS) | species_id
+
+
+def _unpack(keys):
+    return (keys >> (_AXIS_BITS + _SPECIES_BITS),
+            (keys >> _SPECIES_BITS) & _AXIS_MASK,
+            keys & _SPECIES_MASK)
+
+
+def _reduce(keys, counts, sum_lat, sum_lon):
+    """
+    Agrupa por clave empaquetada sumando conteos y coordenadas (group-by vectorizado).
+    """
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    size = len(unique_keys)
+    return (unique_keys,
+            np.bincount(inverse, weights=counts, minlength=size),
+            np.bincount(inverse, weights=sum_lat, minlength=size),
+            np.bincount(inverse, weights=sum_lon, minlength=size))
+
+
+def _aggregate_points(species_id, lat, lon, zoom: int):
+    """
+    Agregados por (celda, especie) para un bloque de arboles.
+    """
+    species_id = np.asarray(species_id, dtype=np.int64)
+    if species_id.size and (species_id.min() < 0 or species_id.max() > _SPECIES_MASK):
+        raise ValueError(f"species_id fuera de rango para el indice de clusters (0..{_SPECIES_MASK})")
+    cell_x, cell_y = point_cells(lon, lat, zoom)
+    keys = _pack(cell_x, cell_y, species_id)
+    return _reduce(keys, np.ones(len(keys)), np.asarray(lat, dtype=float), np.asarray(lon, dtype=float))
+
+
+def _parent_level(keys, counts, sum_lat, sum_lon):
+    """
+    Agrega un nivel en el nivel inmediatamente superior (cada celda padre = 2x2 hijas).
+    """
+    cell_x, cell_y, species_id = _unpack(keys)
+    return _reduce(_pack(cell_x >> 1, cell_y >> 1, species_id), counts, sum_lat, sum_lon)
+
+
+def _level_rows(zoom: int, keys, counts, sum_lat, sum_lon):
+    cell_x, cell_y, species_id = _unpack(keys)
+    return zip([zoom] * len(keys), cell_x.tolist(), cell_y.tolist(), species_id.tolist(),
+               counts.astype(np.int64).tolist(), sum_lat.tolist(), sum_lon.tolist())
+
+
+INSERT_CLUSTER = """
+    INSERT INTO tree_clusters
+    (zoom, cell_x, cell_y, species_id, tree_count, sum_lat, sum_lon)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+class ClusterIndex:
+    """
+    Indice jerarquico de clusters de arboles, un nivel por zoom de mapa web.
+    Cada nivel es una cuadricula de 4x4 celdas por tile Web Mercator y guarda,
+    por celda y especie, el conteo y la suma de coordenadas (para el centroide).
+    """
+
+    # Filas de trees leidas por bloque al construir el indice
+    BUILD_CHUNK_SIZE = 500000
+
+    def __init__(self, db_connection: DatabaseConnection):
+        self.db = db_connection
+
+    def build(self):
+        """
+        Construye el indice completo en pasadas vectorizadas: agrega el nivel
+        mas detallado por bloques y deriva cada nivel superior del anterior.
+        Retorna la cantidad de filas por zoom.
+        """
+        partial = []
+        query = "SELECT species_id, gps_lat, gps_lon FROM trees"
+        for rows in self.db.iter_chunks(query, chunk_size=self.BUILD_CHUNK_SIZE):
+            chunk = np.array(rows, dtype=np.float64)
+            partial.append(_aggregate_points(chunk[:, 0], chunk[:, 1], chunk[:, 2], MAX_CLUSTER_ZOOM))
+
+        if partial:
+            level = _reduce(*(np.concatenate(parts) for parts in zip(*partial)))
+        else:
+            level = tuple(np.array([], dtype=dtype) for dtype in (np.int64, float, float, float))
+
+        rows_per_zoom = {}
+        with self.db.get_connection() as conn:
+            conn.execute(TREE_CLUSTERS_TABLE)
+            conn.execute("DELETE FROM tree_clusters")
+            for zoom in range(MAX_CLUSTER_ZOOM, -1, -1):
+                conn.executemany(INSERT_CLUSTER, _level_rows(zoom, *level))
+                rows_per_zoom[zoom] = len(level[0])
+                level = _parent_level(*level)
+
+        return rows_per_zoom
+
+    def is_built(self, conn: sqlite3.Connection = None) -> bool:
+        """
+        Indica si el indice existe y tiene filas (la tabla la crea migrate.py).
+        """
+        if conn is None:
+            with self.db.get_connection() as conn:
+                return self.is_built(conn)
+        table = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tree_clusters'"
+        ).fetchone()
+        return table is not None and conn.execute("SELECT 1 FROM tree_clusters LIMIT 1").fetchone() is not None
+
+    def refresh_for_batches(self, conn: sqlite3.Connection, batches):
+        """
+        Hook de DetectionWriter: recalcula los tiles tocados por los lotes
+        ingeridos, dentro de la misma transaccion que inserto los arboles.
+        """
+        lats = [row[5] for batch in batches for image in batch for row in image["tree_rows"]]
+        lons = [row[6] for batch in batches for image in batch for row in image["tree_rows"]]
+        if lats:
+            self.refresh_tiles(conn, lons, lats)
+
+    def refresh_tiles(self, conn: sqlite3.Connection, lons, lats):
+        """
+        Recalcula el indice solo para los tiles (del zoom maximo) que contienen
+        los puntos dados: el nivel mas detallado se relee de trees y cada nivel
+        superior se recalcula a partir de sus celdas hijas.
+        No hace nada si el indice aun no se ha construido.
+        """
+        if not self.is_built(conn):
+            return
+
+        cell_x, cell_y = point_cells(lons, lats, MAX_CLUSTER_ZOOM)
+        tiles = set(zip((cell_x >> CELL_BITS).tolist(), (cell_y >> CELL_BITS).tolist()))
+
+        cells_per_tile = 1 << CELL_BITS
+        tiles_per_axis = 1 << MAX_CLUSTER_ZOOM
+        touched = set()
+
+        for tile_x, tile_y in tiles:
+            # Rectangulo del tile (con margen) para leer arboles por idx_trees_gps
+            lon_min, lat_max = mercator_to_lonlat(tile_x / tiles_per_axis, tile_y / tiles_per_axis)
+            lon_max, lat_min = mercator_to_lonlat((tile_x + 1) / tiles_per_axis, (tile_y + 1) / tiles_per_axis)
+            margin = 1e-7
+            rows = conn.execute("""
+                SELECT species_id, gps_lat, gps_lon
+                FROM trees
+                WHERE gps_lat BETWEEN ? AND ?
+                  AND gps_lon BETWEEN ? AND ?
+            """, (float(lat_min) - margin, float(lat_max) + margin,
+                  float(lon_min) - margin, float(lon_max) + margin)).fetchall()
+
+            first_x, first_y = tile_x * cells_per_tile, tile_y * cells_per_tile
+            conn.execute("""
+                DELETE FROM tree_clusters
+                WHERE zoom = ? AND cell_x BETWEEN ? AND ? AND cell_y BETWEEN ? AND ?
+            """, (MAX_CLUSTER_ZOOM, first_x, first_x + cells_per_tile - 1,
+                  first_y, first_y + cells_per_tile - 1))
+
+            if rows:
+                chunk = np.array([tuple(row) for row in rows], dtype=np.float64)
+                keys, counts, sum_lat, sum_lon = _aggregate_points(
+                    chunk[:, 0], chunk[:, 1], chunk[:, 2], MAX_CLUSTER_ZOOM
+                )
+                # El margen puede traer arboles de tiles vecinos
+                row_x, row_y, _ = _unpack(keys)
+                in_tile = ((row_x >> CELL_BITS) == tile_x) & ((row_y >> CELL_BITS) == tile_y)
+                conn.executemany(INSERT_CLUSTER, _level_rows(
+                    MAX_CLUSTER_ZOOM, keys[in_tile], counts[in_tile], sum_lat[in_tile], sum_lon[in_tile]
+                ))
+
+            touched.update((first_x + dx, first_y + dy)
+                           for dx in range(cells_per_tile) for dy in range(cells_per_tile))
+
+        for zoom in range(MAX_CLUSTER_ZOOM - 1, -1, -1):
+            touched = {(x >> 1, y >> 1) for x, y in touched}
+            cells = [(zoom, x, y) for x, y in touched]
+            conn.executemany(
+                "DELETE FROM tree_clusters WHERE zoom = ? AND cell_x = ? AND cell_y = ?", cells
+            )
+            conn.executemany("""
+                INSERT INTO tree_clusters
+                (zoom, cell_x, cell_y, species_id, tree_count, sum_lat, sum_lon)
+                SELECT ?1, cell_x / 2, cell_y / 2, species_id,
+                       SUM(tree_count), SUM(sum_lat), SUM(sum_lon)
+                FROM tree_clusters
+                WHERE zoom = ?1 + 1
+                  AND cell_x BETWEEN ?2 * 2 AND ?2 * 2 + 1
+                  AND cell_y BETWEEN ?3 * 2 AND ?3 * 2 + 1
+                GROUP BY cell_x / 2, cell_y / 2, species_id
+            """, cells)
+
+    def get_clusters(self, zoom: int, lon_min: float, lat_min: float, lon_max: float, lat_max: float,
+                     max_features: int = MAX_FEATURES):
+        """
+        Obtener los clusters de un viewport con su centroide, conteo y desglose
+        por especie. Si el bbox cubre mas de max_features celdas en ese zoom se
+        usa el nivel superior, para acotar la cantidad de features.
+        """
+        level = max(0, min(zoom, MAX_CLUSTER_ZOOM))
+        while True:
+            # Esquinas noroeste y sureste del bbox (y crece hacia el sur)
+            corner_x, corner_y = point_cells([lon_min, lon_max], [lat_max, lat_min], level)
+            x_min, x_max = corner_x.tolist()
+            y_min, y_max = corner_y.tolist()
+            if level == 0 or (x_max - x_min + 1) * (y_max - y_min + 1) <= max_features:
+                break
+            level -= 1
+
+        query = """
+            SELECT cell_x, cell_y, species_id, tree_count, sum_lat, sum_lon
+            FROM tree_clusters
+            WHERE zoom = ?
+              AND cell_x BETWEEN ? AND ?
+              AND cell_y BETWEEN ? AND ?
+        """
+        cells = {}
+        for rows in self.db.iter_chunks(query, (level, x_min, x_max, y_min, y_max)):
+            for cell_x, cell_y, species_id, count, sum_lat, sum_lon in rows:
+                cells.setdefault((cell_x, cell_y), []).append((species_id, count, sum_lat, sum_lon))
+
+        clusters = []
+        for (cell_x, cell_y), species_rows in sorted(cells.items()):
+            count = sum(row[1] for row in species_rows)
+            clusters.append({
+                "cell_x": cell_x,
+                "cell_y": cell_y,
+                "lat": sum(row[2] for row in species_rows) / count,
+                "lon": sum(row[3] for row in species_rows) / count,
+                "count": count,
+                "species": [
+                    {"species_id": species_id, "count": species_count}
+                    for species_id, species_count, _, _ in sorted(species_rows, key=lambda row: -row[1])
+                ],
+            })
+
+        return {"cluster_zoom": level, "clusters": clusters}
@@ -3,12 +3,19 @@ import sqlite3
 import os
 from typing import List, Dict
 
+# Mayor valor de una columna INTEGER de SQLite (entero con signo de 64 bits)
+SQLITE_MAX_INTEGER = 2 ** 63 - 1
+
 class DatabaseConnection:
     def __init__(self, db_path: str = None):
         """
         Inicializa la conexion a la base de datos.
-        Si no se proporciona una ruta, se usa la base de datos por defecto (tree_detection.db).
+        Si no se proporciona una ruta, se usa la variable de entorno TREE_DB_PATH
+        o, en su defecto, la base de datos por defecto (tree_detection.db).
         """
+        if db_path is None:
+            db_path = os.getenv('TREE_DB_PATH')
+
         if db_path is None:
             current_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
             self.db_path = os.path.join(current_dir, 'tree_detection.db')
@@ -49,6 +56,21 @@ class DatabaseConnection:
             cursor.execute(query, params or ())
             return self.rows_to_dict(cursor.fetchall())
 
+    def iter_chunks(self, query: str, params: tuple = None, chunk_size: int = 50000):
+        """
+        Ejecuta una consulta SQL y retorna sus filas por bloques (listas de tuplas),
+        sin cargar todo el resultado en memoria.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            cursor.execute(query, params or ())
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+
     def execute_scalar(self, query: str, params: tuple = None):
         """
         Ejecuta una consulta SQL y retorna un unico valor (por ejemplo, COUNT o MAX).
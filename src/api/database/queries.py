@@ -1,5 +1,11 @@
 # src/api/database/queries.py
+import math
+from datetime import date, timedelta
+
+import numpy as np
+
 from .connection import DatabaseConnection
+from ..geometry import points_in_polygons, polygons_bounds
 
 class SpeciesQueries:
     def __init__(self, db_connection: DatabaseConnection):
@@ -24,8 +30,38 @@ class SpeciesQueries:
         """
         return self.db.execute_query(query)
 
+    def get_species_ids(self):
+        """
+        Obtener el conjunto de IDs de especies existentes.
+        """
+        rows = self.db.execute_query("SELECT species_id FROM species")
+        return {row["species_id"] for row in rows}
+
 
 class TreeQueries:
+    # Filtros de rango soportados: nombre del filtro -> (columna, operador)
+    RANGE_FILTERS = {
+        "min_confidence": ("t.detection_confidence", ">="),
+        "min_height": ("t.estimated_height_m", ">="),
+        "max_height": ("t.estimated_height_m", "<="),
+        "min_crown_diameter": ("t.estimated_crown_diameter_m", ">="),
+        "max_crown_diameter": ("t.estimated_crown_diameter_m", "<="),
+    }
+
+    # Claves de ordenamiento permitidas (prefijo '-' para descendente)
+    SORT_COLUMNS = {
+        "tree_id": "t.tree_id",
+        "confidence": "t.detection_confidence",
+        "height": "t.estimated_height_m",
+        "crown_diameter": "t.estimated_crown_diameter_m",
+        "detection_date": "t.detection_date",
+    }
+
+    # Filas candidatas por bloque en la prueba punto-en-poligono
+    WITHIN_CHUNK_SIZE = 50000
+    # IDs por consulta "IN (...)" (por debajo del limite de variables de SQLite)
+    ID_BATCH_SIZE = 900
+
     def __init__(self, db_connection: DatabaseConnection):
         self.db = db_connection
 
@@ -65,6 +101,153 @@ class TreeQueries:
             "total_pages": (total + per_page - 1) // per_page
         }
 
+    def build_filter_clause(self, filters: dict = None):
+        """
+        Construye la clausula WHERE parametrizada a partir de los filtros.
+        Retorna una tupla (sql, params); sql es una cadena vacia si no hay filtros.
+        """
+        filters = filters or {}
+        conditions = []
+        params = []
+
+        for name, (column, operator) in self.RANGE_FILTERS.items():
+            if filters.get(name) is not None:
+                conditions.append(f"{column} {operator} ?")
+                params.append(filters[name])
+
+        species_ids = filters.get("species_ids")
+        if species_ids:
+            placeholders = ", ".join("?" for _ in species_ids)
+            conditions.append(f"t.species_id IN ({placeholders})")
+            params.extend(species_ids)
+
+        if filters.get("image_id") is not None:
+            conditions.append("t.image_id = ?")
+            params.append(filters["image_id"])
+
+        if filters.get("date_from"):
+            conditions.append("t.detection_date >= ?")
+            params.append(filters["date_from"])
+
+        date_to = filters.get("date_to")
+        if date_to:
+            # Una fecha sin hora incluye el dia completo
+            if len(date_to) == 10:
+                conditions.append("t.detection_date < ?")
+                params.append((date.fromisoformat(date_to) + timedelta(days=1)).isoformat())
+            else:
+                conditions.append("t.detection_date <= ?")
+                params.append(date_to)
+
+        if not conditions:
+            return "", []
+        return "WHERE " + " AND ".join(conditions), params
+
+    def build_order_clause(self, sort: str = "tree_id", filters: dict = None):
+        """
+        Construye la clausula ORDER BY a partir de una clave de ordenamiento.
+        Lanza ValueError si la clave no esta permitida.
+        """
+        descending = sort.startswith("-")
+        key = sort[1:] if descending else sort
+
+        if key not in self.SORT_COLUMNS:
+            raise ValueError(
+                f"Ordenamiento invalido: {sort}. Opciones: {', '.join(self.SORT_COLUMNS)}"
+            )
+
+        column = self.SORT_COLUMNS[key]
+        if self._has_filters(filters) and column not in self._filtered_columns(filters):
+            # Con filtros activos, el '+' evita que SQLite recorra toda la tabla
+            # en el orden de la columna; asi usa el indice del filtro y ordena
+            # solo las filas que coinciden.
+            column = "+" + column
+
+        direction = "DESC" if descending else "ASC"
+        order = f"ORDER BY {column} {direction}"
+        if key != "tree_id":
+            # Desempate estable para que la paginacion sea determinista
+            order += f", t.tree_id {direction}"
+        return order
+
+    def _has_filters(self, filters: dict = None):
+        """
+        Indica si hay al menos un filtro activo.
+        """
+        return bool(filters) and any(value not in (None, "", []) for value in filters.values())
+
+    def _filtered_columns(self, filters: dict):
+        """
+        Columnas con un filtro de rango activo (pueden servir tambien para ordenar).
+        """
+        columns = {
+            column for name, (column, _) in self.RANGE_FILTERS.items()
+            if filters.get(name) is not None
+        }
+        if filters.get("date_from") or filters.get("date_to"):
+            columns.add("t.detection_date")
+        return columns
+
+    def build_search_queries(self, filters: dict = None, sort: str = "tree_id"):
+        """
+        Genera las consultas parametrizadas de conteo y de pagina para search_trees.
+        Retorna ((count_sql, count_params), (page_sql, page_params)); a page_params
+        se le deben agregar LIMIT y OFFSET.
+        """
+        where, params = self.build_filter_clause(filters)
+        order = self.build_order_clause(sort, filters)
+
+        count_query = f"SELECT COUNT(*) FROM trees t {where}"
+        # La pagina se resuelve primero solo con tree_id (normalmente desde un
+        # indice cubriente) y despues se leen las filas completas y los JOIN
+        # unicamente para esos per_page arboles.
+        page_query = f"""
+            SELECT 
+                t.tree_id,
+                t.species_id,
+                s.common_name AS species_name,
+                t.image_id,
+                t.gps_lat,
+                t.gps_lon,
+                t.detection_confidence,
+                t.estimated_height_m,
+                t.estimated_crown_diameter_m,
+                t.detection_date,
+                i.filename AS source_image
+            FROM (
+                SELECT t.tree_id
+                FROM trees t
+                {where}
+                {order}
+                LIMIT ? OFFSET ?
+            ) AS page
+            CROSS JOIN trees t ON t.tree_id = page.tree_id
+            JOIN species s ON t.species_id = s.species_id
+            JOIN images i ON t.image_id = i.image_id
+            {self.build_order_clause(sort)}
+        """
+        return (count_query, params), (page_query, params)
+
+    def search_trees(self, filters: dict = None, sort: str = "tree_id", page: int = 1, per_page: int = 50):
+        """
+        Obtener arboles con filtros combinables, ordenamiento y paginacion.
+        """
+        offset = (page - 1) * per_page
+        (count_query, count_params), (page_query, page_params) = \
+            self.build_search_queries(filters, sort)
+
+        total = self.db.execute_scalar(count_query, tuple(count_params))
+        trees = self.db.execute_query(page_query, tuple(page_params) + (per_page, offset))
+
+        return {
+            "trees": trees,
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "total_pages": (total + per_page - 1) // per_page,
+            "sort": sort
+        }
+
     def get_tree_by_id(self, tree_id: int):
         """
         Obtener un arbol especifico por su ID.
@@ -106,19 +289,22 @@ class TreeQueries:
         total = self.db.execute_scalar(count_query, (species_id,))
         
         # Obtener los arboles de la especie
+        # (la vista trees_full_info no expone species_id, se filtra sobre trees)
         query = """
             SELECT 
-                tree_id,
-                species_name,
-                scientific_name,
-                gps_lat,
-                gps_lon,
-                detection_confidence,
-                estimated_height_m,
-                source_image
-            FROM trees_full_info
-            WHERE species_id = ?
-            ORDER BY tree_id
+                t.tree_id,
+                s.common_name AS species_name,
+                s.scientific_name,
+                t.gps_lat,
+                t.gps_lon,
+                t.detection_confidence,
+                t.estimated_height_m,
+                i.filename AS source_image
+            FROM trees t
+            JOIN species s ON t.species_id = s.species_id
+            JOIN images i ON t.image_id = i.image_id
+            WHERE t.species_id = ?
+            ORDER BY t.tree_id
             LIMIT ? OFFSET ?
         """
         trees = self.db.execute_query(query, (species_id, per_page, offset))
@@ -152,6 +338,174 @@ class TreeQueries:
         """
         return self.db.execute_query(query, (lat_min, lat_max, lon_min, lon_max))
 
+    def iter_tree_ids_within(self, polygons):
+        """
+        Retorna, por bloques, los IDs de los arboles dentro de los poligonos.
+        El rectangulo envolvente se resuelve con idx_trees_gps (indice cubriente
+        para tree_id, gps_lat, gps_lon) y cada bloque se filtra con NumPy.
+        """
+        lat_min, lat_max, lon_min, lon_max = polygons_bounds(polygons)
+        query = """
+            SELECT tree_id, gps_lat, gps_lon
+            FROM trees
+            WHERE gps_lat BETWEEN ? AND ?
+              AND gps_lon BETWEEN ? AND ?
+        """
+        params = (lat_min, lat_max, lon_min, lon_max)
+
+        for rows in self.db.iter_chunks(query, params, self.WITHIN_CHUNK_SIZE):
+            chunk = np.array(rows, dtype=np.float64)
+            inside = points_in_polygons(chunk[:, 2], chunk[:, 1], polygons)
+            if inside.any():
+                yield chunk[inside, 0].astype(np.int64)
+
+    def _iter_id_batches(self, polygons):
+        """
+        Reagrupa los IDs dentro de los poligonos en lotes de ID_BATCH_SIZE.
+        """
+        for ids in self.iter_tree_ids_within(polygons):
+            for start in range(0, len(ids), self.ID_BATCH_SIZE):
+                yield ids[start:start + self.ID_BATCH_SIZE].tolist()
+
+    def count_trees_within(self, polygons):
+        """
+        Contar los arboles dentro de un Polygon/MultiPolygon sin leer sus filas.
+        """
+        return int(sum(len(ids) for ids in self.iter_tree_ids_within(polygons)))
+
+    def get_trees_within(self, polygons, page: int = 1, per_page: int = 50):
+        """
+        Buscar arboles dentro de un Polygon/MultiPolygon (con huecos), con paginacion.
+        Solo se mantienen en memoria los IDs; las filas se leen para la pagina pedida.
+        """
+        chunks = list(self.iter_tree_ids_within(polygons))
+        ids = np.sort(np.concatenate(chunks)) if chunks else np.array([], dtype=np.int64)
+        total = len(ids)
+
+        offset = (page - 1) * per_page
+        page_ids = ids[offset:offset + per_page].tolist()
+        trees = []
+        if page_ids:
+            placeholders = ", ".join("?" for _ in page_ids)
+            query = f"""
+                SELECT 
+                    t.tree_id,
+                    s.common_name AS species_name,
+                    t.gps_lat,
+                    t.gps_lon,
+                    t.detection_confidence,
+                    t.estimated_height_m,
+                    i.filename AS source_image
+                FROM trees t
+                JOIN species s ON t.species_id = s.species_id
+                JOIN images i ON t.image_id = i.image_id
+                WHERE t.tree_id IN ({placeholders})
+                ORDER BY t.tree_id
+            """
+            trees = self.db.execute_query(query, tuple(page_ids))
+
+        return {
+            "trees": trees,
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "total_pages": (total + per_page - 1) // per_page
+        }
+
+    def get_stats_within(self, polygons):
+        """
+        Estadisticas zonales de los arboles dentro de un Polygon/MultiPolygon.
+        Se agregan en SQL por lotes de IDs, sin materializar las filas.
+        """
+        # species_id -> [count, conf_sum, conf_min, conf_max,
+        #                height_n, height_sum, height_min, height_max,
+        #                crown_n, crown_sum, crown_min, crown_max]
+        totals = {}
+
+        for batch in self._iter_id_batches(polygons):
+            placeholders = ", ".join("?" for _ in batch)
+            query = f"""
+                SELECT 
+                    species_id,
+                    COUNT(*),
+                    SUM(detection_confidence),
+                    MIN(detection_confidence),
+                    MAX(detection_confidence),
+                    COUNT(estimated_height_m),
+                    SUM(estimated_height_m),
+                    MIN(estimated_height_m),
+                    MAX(estimated_height_m),
+                    COUNT(estimated_crown_diameter_m),
+                    SUM(estimated_crown_diameter_m),
+                    MIN(estimated_crown_diameter_m),
+                    MAX(estimated_crown_diameter_m)
+                FROM trees
+                WHERE tree_id IN ({placeholders})
+                GROUP BY species_id
+            """
+            for rows in self.db.iter_chunks(query, tuple(batch)):
+                for species_id, *values in rows:
+                    current = totals.get(species_id, [0, 0, None, None] * 3)
+                    totals[species_id] = _merge_aggregates(current, values)
+
+        return _format_zonal_stats(totals, self._species_names())
+
+    def _species_names(self):
+        rows = self.db.execute_query("SELECT species_id, common_name FROM species")
+        return {row["species_id"]: row["common_name"] for row in rows}
+
+
+def _merge_aggregates(current, values):
+    """
+    Combina dos agregados parciales (count, sum, min, max) x 3 columnas.
+    """
+    merged = []
+    for offset in range(0, 12, 4):
+        n_a, sum_a, min_a, max_a = current[offset:offset + 4]
+        n_b, sum_b, min_b, max_b = values[offset:offset + 4]
+        merged.extend([
+            n_a + n_b,
+            (sum_a or 0) + (sum_b or 0),
+            min(v for v in (min_a, min_b) if v is not None) if n_a + n_b else None,
+            max(v for v in (max_a, max_b) if v is not None) if n_a + n_b else None,
+        ])
+    return merged
+
+
+def _format_zonal_stats(totals: dict, species_names: dict):
+    """
+    Da formato a los agregados por especie (mismo estilo que get_statistics).
+    """
+    overall = [0, 0, None, None] * 3
+    for values in totals.values():
+        overall = _merge_aggregates(overall, values)
+
+    def summary(name, values, scale=1.0):
+        n, total, low, high = values
+        return {
+            f"avg_{name}": round(total / n * scale, 2) if n else None,
+            f"min_{name}": round(low * scale, 2) if n else None,
+            f"max_{name}": round(high * scale, 2) if n else None,
+        }
+
+    species_distribution = [
+        {
+            "species_id": species_id,
+            "common_name": species_names.get(species_id),
+            "count": values[0],
+            "avg_confidence": round(values[1] / values[0] * 100, 2),
+        }
+        for species_id, values in sorted(totals.items(), key=lambda item: -item[1][0])
+    ]
+
+    return {
+        "total_trees": overall[0],
+        "species_distribution": species_distribution,
+        "confidence_stats": summary("confidence", overall[0:4], scale=100),
+        "height_stats": summary("height_m", overall[4:8]),
+        "crown_diameter_stats": summary("crown_diameter_m", overall[8:12]),
+    }
+
 
 class ImageQueries:
     def __init__(self, db_connection: DatabaseConnection):
@@ -175,6 +529,65 @@ class ImageQueries:
         """
         return self.db.execute_query(query)
 
+    def get_images_covering_point(self, lat: float, lon: float):
+        """
+        Obtener las imagenes cuya huella en tierra contiene el punto (lat, lon),
+        la de centro mas cercano primero. Usa el R*Tree image_footprints.
+        """
+        query = """
+            SELECT 
+                i.image_id,
+                i.filename,
+                i.gps_center_lat,
+                i.gps_center_lon,
+                i.total_trees_detected,
+                i.processing_date,
+                f.lat_min,
+                f.lat_max,
+                f.lon_min,
+                f.lon_max
+            FROM image_footprints f
+            JOIN images i ON i.image_id = f.image_id
+            WHERE f.min_lat <= ? AND f.max_lat >= ?
+              AND f.min_lon <= ? AND f.max_lon >= ?
+              AND f.lat_min <= ? AND f.lat_max >= ?
+              AND f.lon_min <= ? AND f.lon_max >= ?
+            ORDER BY (i.gps_center_lat - ?) * (i.gps_center_lat - ?)
+                   + (i.gps_center_lon - ?) * (i.gps_center_lon - ?) * ?
+        """
+        # Distancia en tierra: un grado de longitud mide cos(lat) grados de latitud
+        lon_scale = math.cos(math.radians(lat)) ** 2
+        params = (lat, lat, lon, lon) * 2 + (lat, lat, lon, lon, lon_scale)
+        return self.db.execute_query(query, params)
+
+    def get_images_covering_area(self, lat_min: float, lat_max: float, lon_min: float, lon_max: float):
+        """
+        Obtener las imagenes cuya huella en tierra se intersecta con un area.
+        Usa el R*Tree image_footprints.
+        """
+        query = """
+            SELECT 
+                i.image_id,
+                i.filename,
+                i.gps_center_lat,
+                i.gps_center_lon,
+                i.total_trees_detected,
+                i.processing_date,
+                f.lat_min,
+                f.lat_max,
+                f.lon_min,
+                f.lon_max
+            FROM image_footprints f
+            JOIN images i ON i.image_id = f.image_id
+            WHERE f.min_lat <= ? AND f.max_lat >= ?
+              AND f.min_lon <= ? AND f.max_lon >= ?
+              AND f.lat_min <= ? AND f.lat_max >= ?
+              AND f.lon_min <= ? AND f.lon_max >= ?
+            ORDER BY i.image_id
+        """
+        params = (lat_max, lat_min, lon_max, lon_min) * 2
+        return self.db.execute_query(query, params)
+
 
 class StatisticsQueries:
     def __init__(self, db_connection: DatabaseConnection):
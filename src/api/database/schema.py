@@ -0,0 +1,289 @@
+# src/api/database/schema.py
+import math
+import re
+import sqlite3
+from typing import List
+
+from ..geometry import METERS_PER_DEGREE
+
+# ============================================
+# TABLAS Y VISTA BASE
+# Mismo esquema que crea el notebook v2 (CELDA A)
+# ============================================
+
+TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS species (
+        species_id INTEGER PRIMARY KEY,
+        common_name TEXT NOT NULL,
+        scientific_name TEXT NOT NULL,
+        average_height_m REAL,
+        crown_diameter_m REAL,
+        description TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS images (
+        image_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        filename TEXT NOT NULL UNIQUE,
+        width INTEGER DEFAULT 640,
+        height INTEGER DEFAULT 640,
+        gps_center_lat REAL NOT NULL,
+        gps_center_lon REAL NOT NULL,
+        meters_per_pixel REAL DEFAULT 0.78,
+        coverage_area_m2 REAL,
+        processing_date TEXT,
+        total_trees_detected INTEGER DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS trees (
+        tree_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        image_id INTEGER NOT NULL,
+        species_id INTEGER NOT NULL,
+        bbox_x_center REAL NOT NULL,
+        bbox_y_center REAL NOT NULL,
+        bbox_width REAL NOT NULL,
+        bbox_height REAL NOT NULL,
+        gps_lat REAL NOT NULL,
+        gps_lon REAL NOT NULL,
+        detection_confidence REAL NOT NULL,
+        estimated_height_m REAL,
+        estimated_crown_diameter_m REAL,
+        detection_date TEXT,
+        FOREIGN KEY (image_id) REFERENCES images(image_id),
+        FOREIGN KEY (species_id) REFERENCES species(species_id)
+    )
+    """,
+    """
+    CREATE VIEW IF NOT EXISTS trees_full_info AS
+    SELECT
+        t.tree_id,
+        t.gps_lat,
+        t.gps_lon,
+        t.detection_confidence,
+        t.estimated_height_m,
+        s.common_name as species_name,
+        s.scientific_name,
+        i.filename as source_image
+    FROM trees t
+    JOIN species s ON t.species_id = s.species_id
+    JOIN images i ON t.image_id = i.image_id
+    """,
+]
+
+# ============================================
+# INDICES
+# Los compuestos incluyen las columnas de filtro de /api/trees
+# (confianza, altura, copa) para evaluar el WHERE y los COUNT
+# directamente desde el indice, sin leer la fila de la tabla.
+# ============================================
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_trees_gps ON trees(gps_lat, gps_lon)",
+    """
+    CREATE INDEX IF NOT EXISTS idx_trees_confidence
+    ON trees(detection_confidence, estimated_height_m, estimated_crown_diameter_m)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_trees_species_confidence
+    ON trees(species_id, detection_confidence, estimated_height_m, estimated_crown_diameter_m)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_trees_image_confidence
+    ON trees(image_id, detection_confidence, estimated_height_m, estimated_crown_diameter_m)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_trees_height
+    ON trees(estimated_height_m, detection_confidence, estimated_crown_diameter_m)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_trees_crown
+    ON trees(estimated_crown_diameter_m, detection_confidence, estimated_height_m)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_trees_date
+    ON trees(detection_date, detection_confidence, estimated_height_m, estimated_crown_diameter_m)
+    """,
+]
+
+
+# Indices simples del notebook v2 que quedan cubiertos por los compuestos
+# idx_trees_image_confidence e idx_trees_species_confidence (mismo prefijo).
+# migrate.py los elimina para no mantener dos arboles B extra en cada insercion.
+REDUNDANT_INDEXES = ["idx_trees_image", "idx_trees_species"]
+
+
+# ============================================
+# HUELLAS DE IMAGENES (R*Tree)
+# Rectangulo en tierra de cada imagen, calculado como pixel_to_gps del
+# notebook v2. Las columnas del R*Tree son float32 (redondeadas hacia
+# afuera); las auxiliares (+) guardan los limites exactos.
+# Los triggers mantienen el indice al insertar, actualizar o borrar imagenes,
+# tambien cuando escriben otros procesos (notebook, populate_database.py).
+# ============================================
+
+IMAGE_FOOTPRINTS_TABLE = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS image_footprints USING rtree(
+        image_id,
+        min_lat, max_lat,
+        min_lon, max_lon,
+        +lat_min, +lat_max,
+        +lon_min, +lon_max
+    )
+"""
+
+
+def _sql_cos_degrees(angle: str) -> str:
+    """
+    Expresion SQL de cos(angle) con angle en grados, solo con aritmetica:
+    cos() y radians() no existen en SQLite compilado sin SQLITE_ENABLE_MATH_FUNCTIONS,
+    y los triggers corren en la conexion de cualquier proceso que inserte imagenes.
+    Serie de Taylor hasta x^16 en forma de Horner (error < 1e-12 para |lat| <= 90).
+    """
+    x2 = f"(({angle}) * {math.pi / 180!r}) * (({angle}) * {math.pi / 180!r})"
+    expression = "1.0"
+    for k in range(8, 0, -1):
+        expression = f"(1.0 - {x2} / {(2 * k - 1) * (2 * k)}.0 * {expression})"
+    return expression
+
+
+def _footprint_values(row: str) -> str:
+    """
+    Expresiones SQL de la huella para una fila de images (por ejemplo NEW o images).
+    """
+    half_lat = (f"(COALESCE({row}.height, 640) * COALESCE({row}.meters_per_pixel, 0.78) "
+                f"/ 2.0 / {METERS_PER_DEGREE})")
+    half_lon = (f"(COALESCE({row}.width, 640) * COALESCE({row}.meters_per_pixel, 0.78) "
+                f"/ 2.0 / ({METERS_PER_DEGREE} * {_sql_cos_degrees(f'{row}.gps_center_lat')}))")
+    bounds = [
+        f"{row}.gps_center_lat - {half_lat}",
+        f"{row}.gps_center_lat + {half_lat}",
+        f"{row}.gps_center_lon - {half_lon}",
+        f"{row}.gps_center_lon + {half_lon}",
+    ]
+    return ", ".join([f"{row}.image_id"] + bounds + bounds)
+
+
+IMAGE_FOOTPRINT_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_images_footprint_insert
+    AFTER INSERT ON images
+    BEGIN
+        INSERT INTO image_footprints VALUES ({_footprint_values("NEW")});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_images_footprint_update
+    AFTER UPDATE OF gps_center_lat, gps_center_lon, width, height, meters_per_pixel ON images
+    BEGIN
+        DELETE FROM image_footprints WHERE image_id = OLD.image_id;
+        INSERT INTO image_footprints VALUES ({_footprint_values("NEW")});
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_images_footprint_delete
+    AFTER DELETE ON images
+    BEGIN
+        DELETE FROM image_footprints WHERE image_id = OLD.image_id;
+    END
+    """,
+]
+
+
+def ensure_image_footprints(conn: sqlite3.Connection):
+    """
+    Crea el R*Tree de huellas y sus triggers, y calcula las huellas de las
+    imagenes que aun no la tengan (bases de datos creadas antes del indice).
+    Los triggers se recrean siempre para reemplazar versiones anteriores.
+    """
+    conn.execute(IMAGE_FOOTPRINTS_TABLE)
+    for statement in IMAGE_FOOTPRINT_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {_object_name(statement)}")
+        conn.execute(statement)
+
+    total_images = conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+    total_footprints = conn.execute("SELECT COUNT(*) FROM image_footprints").fetchone()[0]
+    if total_images != total_footprints:
+        conn.execute("DELETE FROM image_footprints")
+        conn.execute(f"INSERT INTO image_footprints SELECT {_footprint_values('images')} FROM images")
+
+
+# ============================================
+# INDICE DE CLUSTERS POR ZOOM
+# Una fila por (zoom, celda, especie) con conteo y sumas de coordenadas;
+# los niveles son aditivos: cada celda es la suma de sus 4 hijas.
+# Se llena con ClusterIndex.build() (build_cluster_index.py).
+# ============================================
+
+TREE_CLUSTERS_TABLE = """
+    CREATE TABLE IF NOT EXISTS tree_clusters (
+        zoom INTEGER NOT NULL,
+        cell_x INTEGER NOT NULL,
+        cell_y INTEGER NOT NULL,
+        species_id INTEGER NOT NULL,
+        tree_count INTEGER NOT NULL,
+        sum_lat REAL NOT NULL,
+        sum_lon REAL NOT NULL,
+        PRIMARY KEY (zoom, cell_x, cell_y, species_id)
+    ) WITHOUT ROWID
+"""
+
+
+def create_schema(conn: sqlite3.Connection):
+    """
+    Crea las tablas, la vista y los indices si no existen.
+    Se usa para bases de datos nuevas (pruebas, benchmarks).
+    """
+    for statement in TABLES:
+        conn.execute(statement)
+    ensure_indexes(conn)
+
+
+def ensure_indexes(conn: sqlite3.Connection):
+    """
+    Crea los indices, el R*Tree de huellas y la tabla de clusters que falten.
+    Toma el bloqueo de escritura mientras crea los indices (varios segundos en
+    bases grandes), por eso se ejecuta una sola vez con migrate.py y no al
+    arrancar la aplicacion.
+    """
+    for statement in INDEXES:
+        conn.execute(statement)
+    for name in REDUNDANT_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    ensure_image_footprints(conn)
+    conn.execute(TREE_CLUSTERS_TABLE)
+    conn.commit()
+
+
+def _object_name(statement: str) -> str:
+    return re.search(r"IF NOT EXISTS (\w+)", statement).group(1)
+
+
+def _normalize_sql(statement: str) -> str:
+    # sqlite_master guarda el CREATE sin "IF NOT EXISTS"
+    return " ".join(statement.replace("IF NOT EXISTS ", "").split())
+
+
+# Nombres de los objetos que crea ensure_indexes
+SCHEMA_OBJECTS = [
+    _object_name(statement)
+    for statement in INDEXES + [IMAGE_FOOTPRINTS_TABLE] + IMAGE_FOOTPRINT_TRIGGERS + [TREE_CLUSTERS_TABLE]
+]
+
+
+def missing_schema_objects(conn: sqlite3.Connection) -> List[str]:
+    """
+    Retorna los indices, tablas y triggers de ensure_indexes que aun no existen
+    (los triggers con una definicion anterior cuentan como faltantes) y los
+    indices redundantes que todavia hay que eliminar.
+    Solo lee sqlite_master, asi que se puede llamar al arrancar sin bloquear escrituras.
+    """
+    existing = {name: sql for name, sql in conn.execute("SELECT name, sql FROM sqlite_master")}
+    missing = [name for name in SCHEMA_OBJECTS if name not in existing]
+    for statement in IMAGE_FOOTPRINT_TRIGGERS:
+        name = _object_name(statement)
+        if name in existing and _normalize_sql(existing[name]) != _normalize_sql(statement):
+            missing.append(name)
+    missing.extend(name for name in REDUNDANT_INDEXES if name in existing)
+    return missing
@@ -0,0 +1,366 @@
+# src/api/database/writer.py
+import atexit
+import math
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos (servidor de desarrollo)
+    fcntl = None
+
+from .connection import SQLITE_MAX_INTEGER, DatabaseConnection
+from ..geometry import bbox_to_gps
+
+# Limites de validacion de un lote recibido por POST /api/detections
+MAX_IMAGES_PER_BATCH = 1000
+MAX_DETECTIONS_PER_IMAGE = 5000
+MAX_IMAGE_SIDE_PX = 100000
+
+
+def prepare_detection_batch(payload: dict, species_ids=None):
+    """
+    Valida un lote de imagenes con sus cajas YOLO y lo convierte en filas listas
+    para insertar (el GPS de cada arbol se calcula aqui, fuera del escritor).
+    Si se pasa species_ids, cada deteccion debe usar una de esas especies.
+    Lanza ValueError si el lote es invalido.
+    """
+    images = payload.get("images") if isinstance(payload, dict) else None
+    if not isinstance(images, list) or not images:
+        raise ValueError("Se requiere una lista 'images' no vacia")
+    if len(images) > MAX_IMAGES_PER_BATCH:
+        raise ValueError(f"Maximo {MAX_IMAGES_PER_BATCH} imagenes por lote")
+
+    prepared = []
+    for index, image in enumerate(images):
+        if not isinstance(image, dict):
+            raise ValueError(f"images[{index}] debe ser un objeto")
+        try:
+            prepared.append(_prepare_image(image, species_ids))
+        except (KeyError, TypeError, ValueError, OverflowError) as e:
+            raise ValueError(f"images[{index}] invalida: {e}")
+
+    return prepared
+
+
+def _prepare_image(image: dict, species_ids=None):
+    filename = image["filename"]
+    if not isinstance(filename, str) or not filename:
+        raise ValueError("filename debe ser un texto no vacio")
+
+    center_lat = _finite_float(image["gps_center_lat"], "gps_center_lat")
+    center_lon = _finite_float(image["gps_center_lon"], "gps_center_lon")
+    width = _bounded_int(image.get("width", 640), "width", 1, MAX_IMAGE_SIDE_PX)
+    height = _bounded_int(image.get("height", 640), "height", 1, MAX_IMAGE_SIDE_PX)
+    meters_per_pixel = _finite_float(image.get("meters_per_pixel", 0.78), "meters_per_pixel")
+    processing_date = (_optional_iso_date(image.get("processing_date"), "processing_date")
+                       or datetime.now().isoformat())
+
+    if not (-90 <= center_lat <= 90 and -180 <= center_lon <= 180):
+        raise ValueError("gps_center_lat/gps_center_lon fuera de rango")
+    if meters_per_pixel <= 0:
+        raise ValueError("meters_per_pixel debe ser positivo")
+
+    detections = image.get("detections", [])
+    if not isinstance(detections, list):
+        raise ValueError("detections debe ser una lista")
+    if len(detections) > MAX_DETECTIONS_PER_IMAGE:
+        raise ValueError(f"maximo {MAX_DETECTIONS_PER_IMAGE} detecciones por imagen")
+
+    boxes = []
+    for detection in detections:
+        x_center, y_center, box_width, box_height = (float(v) for v in detection["bbox"])
+        confidence = float(detection["confidence"])
+        if not all(0.0 <= v <= 1.0 for v in (x_center, y_center, box_width, box_height, confidence)):
+            raise ValueError("bbox (YOLO normalizado) y confidence deben estar entre 0 y 1")
+        species_id = _bounded_int(detection["species_id"], "species_id",
+                                  -SQLITE_MAX_INTEGER - 1, SQLITE_MAX_INTEGER)
+        if species_ids is not None and species_id not in species_ids:
+            raise ValueError(f"species_id {species_id} no existe")
+        boxes.append((
+            species_id, x_center, y_center, box_width, box_height, confidence,
+            _optional_float(detection.get("estimated_height_m"), "estimated_height_m"),
+            _optional_float(detection.get("estimated_crown_diameter_m"), "estimated_crown_diameter_m"),
+        ))
+
+    tree_rows = []
+    if boxes:
+        lats, lons = bbox_to_gps(
+            [b[1] for b in boxes], [b[2] for b in boxes],
+            center_lat, center_lon, width, height, meters_per_pixel
+        )
+        detection_date = _optional_iso_date(image.get("detection_date"), "detection_date") or processing_date
+        for box, lat, lon in zip(boxes, lats.tolist(), lons.tolist()):
+            species_id, x_center, y_center, box_width, box_height, confidence, tree_height, crown = box
+            tree_rows.append((
+                species_id, x_center, y_center, box_width, box_height,
+                lat, lon, confidence, tree_height, crown, detection_date
+            ))
+
+    return {
+        "filename": filename,
+        "image_row": (filename, width, height, center_lat, center_lon, meters_per_pixel,
+                      (width * meters_per_pixel) * (height * meters_per_pixel),
+                      processing_date, len(tree_rows)),
+        "tree_rows": tree_rows,
+    }
+
+
+def _bounded_int(value, name: str, minimum: int, maximum: int) -> int:
+    """
+    Entero JSON (o float sin decimales) entre minimum y maximum. Se valida aqui
+    porque un valor que SQLite no puede guardar fallaria en el escritor, despues
+    de haber respondido 202 al cliente.
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{name} debe ser un entero")
+    if isinstance(value, float) and not (math.isfinite(value) and value.is_integer()):
+        raise ValueError(f"{name} debe ser un entero")
+    number = int(value)
+    if not minimum <= number <= maximum:
+        raise ValueError(f"{name} debe estar entre {minimum} y {maximum}")
+    return number
+
+
+def _finite_float(value, name: str) -> float:
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"{name} debe ser un numero finito")
+    return number
+
+
+def _optional_float(value, name: str):
+    return None if value is None else _finite_float(value, name)
+
+
+def _optional_iso_date(value, name: str):
+    """
+    Normaliza una fecha ISO (YYYY-MM-DD o con hora); los filtros de /api/trees
+    comparan texto, asi que se guarda siempre la forma extendida.
+    """
+    if value is None or value == "":
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"{name} debe ser una fecha ISO en texto")
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        try:
+            return datetime.fromisoformat(value).isoformat()
+        except ValueError:
+            raise ValueError(f"{name} debe tener formato ISO (YYYY-MM-DD)")
+
+
+class WriteTicket:
+    """
+    Resultado pendiente de un lote encolado. wait() bloquea hasta que el lote
+    este confirmado (COMMIT) en disco o haya fallado.
+    """
+
+    def __init__(self, batch):
+        self.batch = batch
+        self.detections = sum(len(image["tree_rows"]) for image in batch)
+        self.result = None
+        self.error = None
+        self._done = threading.Event()
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._done.wait(timeout)
+
+    def set_result(self, result):
+        self.result = result
+        self._done.set()
+
+    def set_error(self, error):
+        self.error = error
+        self._done.set()
+
+
+class DetectionWriter:
+    """
+    Escritor unico en segundo plano para la ingesta de detecciones.
+    Los lotes se encolan en una cola acotada y un hilo los agrupa en una sola
+    transaccion (group commit), asi el costo del COMMIT/fsync se reparte entre
+    muchos lotes en lugar de pagarse por fila o por peticion.
+    Con varios procesos (workers de Gunicorn) los escritores se turnan con un
+    bloqueo de archivo (<db>-writer.lock), asi hay un solo escritor a la vez.
+    """
+
+    def __init__(self, db_connection: DatabaseConnection, max_queue_batches: int = 256,
+                 max_group_detections: int = 50000, autostart: bool = True):
+        self.db = db_connection
+        self.max_group_detections = max_group_detections
+        self.autostart = autostart
+        self._queue = queue.Queue(maxsize=max_queue_batches)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._commit_hooks = []
+
+    @property
+    def queue_size(self) -> int:
+        return self._queue.qsize()
+
+    def add_commit_hook(self, hook):
+        """
+        Registra hook(conn, batches), que se ejecuta dentro de la transaccion de
+        cada grupo, despues de insertar los lotes y antes del COMMIT.
+        """
+        self._commit_hooks.append(hook)
+
+    def submit(self, batch) -> WriteTicket:
+        """
+        Encola un lote preparado con prepare_detection_batch.
+        Lanza queue.Full si la cola esta llena (el API responde 429).
+        """
+        if self.autostart:
+            self.start()
+        ticket = WriteTicket(batch)
+        self._queue.put_nowait(ticket)
+        return ticket
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="detection-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def close(self, timeout: float = 30.0):
+        """
+        Confirma los lotes pendientes y detiene el hilo escritor.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+    def _run(self):
+        conn = sqlite3.connect(self.db.db_path, timeout=30)
+        # WAL permite lecturas concurrentes mientras se escribe; con
+        # synchronous=FULL cada COMMIT queda en disco antes de avisar al cliente.
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = FULL")
+        conn.execute("PRAGMA foreign_keys = ON")
+        lock_file = open(self.db.db_path + "-writer.lock", "a")
+
+        try:
+            while True:
+                ticket = self._queue.get()
+                if ticket is None:
+                    return
+
+                # Los lotes que llegan mientras se espera el bloqueo entran al mismo grupo
+                with self._process_lock(lock_file):
+                    group, stop = self._collect_group(ticket)
+                    self._commit_group(conn, group)
+                if stop:
+                    return
+        finally:
+            lock_file.close()
+            conn.close()
+
+    @staticmethod
+    @contextmanager
+    def _process_lock(lock_file):
+        """
+        Bloqueo exclusivo entre procesos: con varios workers de Gunicorn cada
+        uno tiene su propio DetectionWriter, y este bloqueo hace que solo uno
+        escriba a la vez en lugar de competir por el bloqueo de SQLite.
+        """
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _collect_group(self, ticket):
+        """
+        Agrupa el lote recibido con los que ya esten en la cola, hasta
+        max_group_detections. Retorna (grupo, stop) donde stop indica que
+        close() pidio detener el hilo.
+        """
+        group = [ticket]
+        detections = ticket.detections
+        while detections < self.max_group_detections:
+            try:
+                ticket = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if ticket is None:
+                return group, True
+            group.append(ticket)
+            detections += ticket.detections
+        return group, False
+
+    def _commit_group(self, conn: sqlite3.Connection, group):
+        """
+        Inserta todos los lotes del grupo en una transaccion. Si falla, se
+        reintenta lote por lote para que un lote invalido no afecte a los demas.
+        Cualquier excepcion (tambien de los hooks) se asigna al ticket del lote:
+        si escapara, mataria el hilo escritor y los lotes encolados se perderian.
+        """
+        try:
+            with conn:
+                results = [self._insert_batch(conn, ticket.batch) for ticket in group]
+                self._run_commit_hooks(conn, [ticket.batch for ticket in group])
+        except Exception:
+            for ticket in group:
+                try:
+                    with conn:
+                        result = self._insert_batch(conn, ticket.batch)
+                        self._run_commit_hooks(conn, [ticket.batch])
+                    ticket.set_result(result)
+                except Exception as e:
+                    print(f"Error al guardar un lote de detecciones: {e}")
+                    ticket.set_error(e)
+            return
+
+        for ticket, result in zip(group, results):
+            ticket.set_result(result)
+
+    def _run_commit_hooks(self, conn: sqlite3.Connection, batches):
+        for hook in self._commit_hooks:
+            hook(conn, batches)
+
+    def _insert_batch(self, conn: sqlite3.Connection, batch):
+        """
+        Inserta las imagenes de un lote con sus arboles. Las imagenes cuyo
+        filename ya existe se omiten, asi reenviar un lote no duplica arboles.
+        """
+        inserted = []
+        skipped = []
+        detections = 0
+
+        for image in batch:
+            exists = conn.execute(
+                "SELECT 1 FROM images WHERE filename = ?", (image["filename"],)
+            ).fetchone()
+            if exists:
+                skipped.append(image["filename"])
+                continue
+
+            cursor = conn.execute("""
+                INSERT INTO images
+                (filename, width, height, gps_center_lat, gps_center_lon, meters_per_pixel,
+                 coverage_area_m2, processing_date, total_trees_detected)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, image["image_row"])
+            image_id = cursor.lastrowid
+
+            conn.executemany("""
+                INSERT INTO trees
+                (image_id, species_id, bbox_x_center, bbox_y_center, bbox_width, bbox_height,
+                 gps_lat, gps_lon, detection_confidence, estimated_height_m, estimated_crown_diameter_m,
+                 detection_date)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [(image_id,) + row for row in image["tree_rows"]])
+
+            inserted.append({"filename": image["filename"], "image_id": image_id})
+            detections += len(image["tree_rows"])
+
+        return {"images": inserted, "skipped": skipped, "detections": detections}
@@ -0,0 +1,168 @@
+# src/api/geometry.py
+from typing import List
+
+import numpy as np
+
+# Metros por grado de latitud (mismo valor que pixel_to_gps del notebook v2)
+METERS_PER_DEGREE = 111320
+
+# Cantidad maxima de elementos (puntos x aristas) por bloque en points_in_polygon
+MAX_BLOCK_ELEMENTS = 2_000_000
+
+
+def parse_geojson_polygons(geojson: dict) -> List[List[np.ndarray]]:
+    """
+    Convierte un Polygon o MultiPolygon GeoJSON (o un Feature que lo contenga)
+    en una lista de poligonos; cada poligono es una lista de anillos (exterior
+    primero, luego huecos) como arreglos NumPy de forma (n, 2) con (lon, lat).
+    Lanza ValueError si la geometria no es valida.
+    """
+    if not isinstance(geojson, dict):
+        raise ValueError("La geometria debe ser un objeto GeoJSON")
+
+    if geojson.get("type") == "Feature":
+        geojson = geojson.get("geometry") or {}
+
+    geometry_type = geojson.get("type")
+    coordinates = geojson.get("coordinates")
+
+    if geometry_type == "Polygon":
+        polygons = [coordinates]
+    elif geometry_type == "MultiPolygon":
+        polygons = coordinates
+    else:
+        raise ValueError("Tipo de geometria invalido: se espera Polygon o MultiPolygon")
+
+    if not isinstance(polygons, list) or not polygons:
+        raise ValueError("La geometria no tiene coordenadas")
+
+    return [[_parse_ring(ring) for ring in _as_list(polygon, "poligono")] for polygon in polygons]
+
+
+def _as_list(value, name: str):
+    if not isinstance(value, list) or not value:
+        raise ValueError(f"Coordenadas invalidas: {name} vacio")
+    return value
+
+
+def _parse_ring(ring) -> np.ndarray:
+    """
+    Valida un anillo lineal y lo retorna cerrado (ultimo punto igual al primero).
+    """
+    try:
+        points = np.asarray(ring, dtype=float)
+    except (TypeError, ValueError):
+        raise ValueError("Coordenadas invalidas: se esperan pares [lon, lat]")
+
+    if points.ndim != 2 or points.shape[1] < 2:
+        raise ValueError("Coordenadas invalidas: se esperan pares [lon, lat]")
+    points = points[:, :2]
+
+    if not np.all(np.isfinite(points)):
+        raise ValueError("Coordenadas invalidas: valores no numericos")
+    if np.any(np.abs(points[:, 0]) > 180) or np.any(np.abs(points[:, 1]) > 90):
+        raise ValueError("Coordenadas invalidas: fuera de rango lon/lat")
+
+    if not np.array_equal(points[0], points[-1]):
+        points = np.vstack([points, points[:1]])
+    if len(points) < 4:
+        raise ValueError("Coordenadas invalidas: un anillo necesita al menos 3 vertices")
+    return points
+
+
+def polygons_bounds(polygons: List[List[np.ndarray]]):
+    """
+    Retorna el rectangulo envolvente (lat_min, lat_max, lon_min, lon_max).
+    Solo se usan los anillos exteriores, los huecos siempre estan dentro.
+    """
+    exteriors = np.vstack([polygon[0] for polygon in polygons])
+    lon_min, lat_min = exteriors.min(axis=0)
+    lon_max, lat_max = exteriors.max(axis=0)
+    return float(lat_min), float(lat_max), float(lon_min), float(lon_max)
+
+
+def points_in_polygons(lon: np.ndarray, lat: np.ndarray, polygons: List[List[np.ndarray]]) -> np.ndarray:
+    """
+    Prueba punto-en-poligono vectorizada (regla par-impar).
+    Un punto esta dentro si esta dentro de algun poligono y fuera de sus huecos.
+    """
+    inside = np.zeros(len(lon), dtype=bool)
+
+    for polygon in polygons:
+        exterior = polygon[0]
+        # Prefiltro por el rectangulo de cada poligono del MultiPolygon
+        candidates = np.flatnonzero(
+            ~inside
+            & (lon >= exterior[:, 0].min()) & (lon <= exterior[:, 0].max())
+            & (lat >= exterior[:, 1].min()) & (lat <= exterior[:, 1].max())
+        )
+        if candidates.size == 0:
+            continue
+
+        # Con la regla par-impar, recorrer todos los anillos descuenta los huecos
+        edges = np.vstack([np.hstack([ring[:-1], ring[1:]]) for ring in polygon])
+        crossings = _count_crossings(lon[candidates], lat[candidates], edges)
+        inside[candidates] = crossings % 2 == 1
+
+    return inside
+
+
+def _count_crossings(px: np.ndarray, py: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """
+    Cuenta cuantas aristas cruza un rayo horizontal desde cada punto hacia +lon.
+    Se procesa en bloques de aristas para limitar la memoria (puntos x aristas).
+    """
+    crossings = np.zeros(len(px), dtype=np.int64)
+    block = max(1, MAX_BLOCK_ELEMENTS // max(1, len(px)))
+    px = px[:, None]
+    py = py[:, None]
+
+    for start in range(0, len(edges), block):
+        x1, y1, x2, y2 = edges[start:start + block].T
+        straddles = (y1 > py) != (y2 > py)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_cross = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+        crossings += np.count_nonzero(straddles & (px < x_cross), axis=1)
+
+    return crossings
+
+
+def bbox_to_gps(x_center, y_center, image_lat: float, image_lon: float,
+                width: int = 640, height: int = 640, meters_per_pixel: float = 0.78):
+    """
+    Convierte centros de cajas YOLO (normalizados 0-1) a coordenadas GPS,
+    igual que pixel_to_gps del notebook v2. Retorna (lats, lons) como arreglos NumPy.
+    """
+    offset_x_meters = (np.asarray(x_center, dtype=float) - 0.5) * width * meters_per_pixel
+    offset_y_meters = (np.asarray(y_center, dtype=float) - 0.5) * height * meters_per_pixel
+
+    lats = image_lat - offset_y_meters / METERS_PER_DEGREE
+    lons = image_lon + offset_x_meters / (METERS_PER_DEGREE * np.cos(np.radians(image_lat)))
+    return lats, lons
+
+
+# Latitud maxima representable en Web Mercator
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def lonlat_to_mercator(lon, lat):
+    """
+    Convierte lon/lat a coordenadas Web Mercator normalizadas en [0, 1)
+    (x hacia el este, y hacia el sur, como los tiles de mapas web).
+    """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.radians(np.clip(np.asarray(lat, dtype=float), -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+    x = (lon + 180.0) / 360.0
+    y = (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / np.pi) / 2.0
+    return np.clip(x, 0.0, np.nextafter(1.0, 0.0)), np.clip(y, 0.0, np.nextafter(1.0, 0.0))
+
+
+def mercator_to_lonlat(x, y):
+    """
+    Inversa de lonlat_to_mercator. Retorna (lon, lat).
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    lon = x * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1.0 - 2.0 * y))))
+    return lon, lat
@@ -1,6 +1,13 @@
 # src/api/routes.py
+import math
+import os
+import queue
+from datetime import date, datetime, timedelta
 from flask import Blueprint, request, jsonify
 from .database import DatabaseManager
+from .database.connection import SQLITE_MAX_INTEGER
+from .database.writer import prepare_detection_batch
+from .geometry import parse_geojson_polygons, polygons_bounds
 
 # Crear Blueprint para las rutas del API
 api_bp = Blueprint('api', __name__)
@@ -31,12 +38,107 @@ def get_species():
 # ENDPOINTS DE ARBOLES
 # ============================================
 
+# Maximo de especies distintas en el filtro species_id de /api/trees
+MAX_SPECIES_FILTER = 100
+
+
+def parse_sqlite_int(value, name: str) -> int:
+    """
+    Convierte un parametro a entero dentro del rango de INTEGER de SQLite (64 bits).
+    Lanza ValueError si no es un entero valido.
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"Parametro invalido: {name} debe ser entero")
+    if not -SQLITE_MAX_INTEGER - 1 <= number <= SQLITE_MAX_INTEGER:
+        raise ValueError(f"Parametro invalido: {name} fuera de rango")
+    return number
+
+
+def parse_tree_filters(args):
+    """
+    Lee los filtros combinables de /api/trees desde los query params.
+    Lanza ValueError si algun valor es invalido.
+    """
+    filters = {}
+
+    for name in ('min_confidence', 'min_height', 'max_height',
+                 'min_crown_diameter', 'max_crown_diameter'):
+        value = args.get(name)
+        if value is not None:
+            try:
+                number = float(value)
+            except ValueError:
+                number = math.nan
+            if not math.isfinite(number):
+                raise ValueError(f"Parametro invalido: {name} debe ser numerico")
+            filters[name] = number
+
+    # species_id acepta valores repetidos (?species_id=1&species_id=2) o separados por coma
+    species_ids = []
+    for value in args.getlist('species_id'):
+        for part in value.split(','):
+            if part.strip():
+                species_ids.append(parse_sqlite_int(part, 'species_id'))
+    # Sin duplicados y acotado: cada ID es un parametro del IN (...) de SQLite
+    species_ids = list(dict.fromkeys(species_ids))
+    if len(species_ids) > MAX_SPECIES_FILTER:
+        raise ValueError(f"Parametro invalido: maximo {MAX_SPECIES_FILTER} species_id")
+    if species_ids:
+        filters['species_ids'] = species_ids
+
+    image_id = args.get('image_id')
+    if image_id is not None:
+        filters['image_id'] = parse_sqlite_int(image_id, 'image_id')
+
+    for name in ('date_from', 'date_to'):
+        value = args.get(name)
+        if value:
+            # Se guarda la forma normalizada porque el filtro compara texto
+            # (fromisoformat tambien acepta formas compactas como 20250301)
+            try:
+                filters[name] = date.fromisoformat(value).isoformat()
+            except ValueError:
+                try:
+                    parsed = datetime.fromisoformat(value)
+                except ValueError:
+                    raise ValueError(f"Parametro invalido: {name} debe tener formato ISO (YYYY-MM-DD)")
+                if parsed.tzinfo is not None:
+                    raise ValueError(f"Parametro invalido: {name} no debe incluir zona horaria")
+                filters[name] = parsed.isoformat()
+
+    # Validar rangos logicos
+    for low, high in (('min_height', 'max_height'),
+                      ('min_crown_diameter', 'max_crown_diameter')):
+        if low in filters and high in filters and filters[low] > filters[high]:
+            raise ValueError(f"Rango invalido: {low} debe ser <= {high}")
+
+    if 'date_from' in filters and 'date_to' in filters:
+        # Un date_to sin hora incluye todo el dia (igual que build_filter_clause)
+        date_from = datetime.fromisoformat(filters['date_from'])
+        date_to = datetime.fromisoformat(filters['date_to'])
+        if len(filters['date_to']) == 10:
+            valid = date_from < date_to + timedelta(days=1)
+        else:
+            valid = date_from <= date_to
+        if not valid:
+            raise ValueError("Rango invalido: date_from debe ser <= date_to")
+
+    return filters
+
+
 @api_bp.route('/trees', methods=['GET'])
 def get_trees():
-    """GET /api/trees?page=1&per_page=50 - Retorna arboles con paginacion."""
+    """
+    GET /api/trees?page=1&per_page=50 - Retorna arboles con paginacion.
+    Filtros opcionales: min_confidence, min_height, max_height, min_crown_diameter,
+    max_crown_diameter, species_id (multiple), image_id, date_from, date_to, sort.
+    """
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 50, type=int)
+        sort = request.args.get('sort', 'tree_id')
         
         # Validar parametros
         if page < 1 or per_page < 1 or per_page > 100:
@@ -45,7 +147,14 @@ def get_trees():
                 "error": "Parametros invalidos: page >= 1, 1 <= per_page <= 100"
             }), 400
         
-        result = db.trees.get_trees_paginated(page=page, per_page=per_page)
+        try:
+            filters = parse_tree_filters(request.args)
+            result = db.trees.search_trees(filters, sort=sort, page=page, per_page=per_page)
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 400
         
         return jsonify({
             "success": True,
@@ -53,6 +162,8 @@ def get_trees():
             "per_page": result["per_page"],
             "total": result["total"],
             "total_pages": result["total_pages"],
+            "sort": result["sort"],
+            "filters": filters,
             "count": len(result["trees"]),
             "data": result["trees"]
         })
@@ -169,6 +280,219 @@ def get_trees_in_area():
         }), 500
 
 
+@api_bp.route('/trees/clusters', methods=['GET'])
+def get_tree_clusters():
+    """
+    GET /api/trees/clusters?zoom=14&bbox=-84.10,9.92,-84.07,9.95
+    Retorna clusters (centroide, conteo y desglose por especie) para un viewport.
+    bbox = lon_min,lat_min,lon_max,lat_max
+    """
+    try:
+        zoom = request.args.get('zoom', type=int)
+        bbox = request.args.get('bbox', '')
+        
+        try:
+            lon_min, lat_min, lon_max, lat_max = (float(v) for v in bbox.split(','))
+        except ValueError:
+            lon_min = None
+        if lon_min is not None and not all(map(math.isfinite, (lon_min, lat_min, lon_max, lat_max))):
+            lon_min = None
+        
+        # Validar parametros requeridos
+        if zoom is None or lon_min is None:
+            return jsonify({
+                "success": False,
+                "error": "Parametros requeridos: zoom, bbox=lon_min,lat_min,lon_max,lat_max"
+            }), 400
+        
+        # Validar rangos logicos
+        if zoom < 0 or lon_min >= lon_max or lat_min >= lat_max:
+            return jsonify({
+                "success": False,
+                "error": "Rangos invalidos: zoom >= 0, lon_min < lon_max y lat_min < lat_max"
+            }), 400
+        
+        if not db.clusters.is_built():
+            return jsonify({
+                "success": False,
+                "error": "Indice de clusters no construido. Ejecutar build_cluster_index.py"
+            }), 503
+        
+        result = db.clusters.get_clusters(zoom, lon_min, lat_min, lon_max, lat_max)
+        
+        return jsonify({
+            "success": True,
+            "zoom": zoom,
+            "cluster_zoom": result["cluster_zoom"],
+            "bbox": [lon_min, lat_min, lon_max, lat_max],
+            "count": len(result["clusters"]),
+            "data": result["clusters"]
+        })
+    
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+@api_bp.route('/trees/within', methods=['POST'])
+def get_trees_within():
+    """
+    POST /api/trees/within?page=1&per_page=50 - Retorna los arboles dentro de un
+    Polygon/MultiPolygon GeoJSON. El modo rows esta paginado igual que /api/trees.
+    Cuerpo: {"geometry": {...}, "mode": "rows" | "count" | "stats"} o la geometria directa.
+    """
+    try:
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 50, type=int)
+        
+        # Validar parametros
+        if page < 1 or per_page < 1 or per_page > 100:
+            return jsonify({
+                "success": False,
+                "error": "Parametros invalidos: page >= 1, 1 <= per_page <= 100"
+            }), 400
+        
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            return jsonify({
+                "success": False,
+                "error": "Se requiere un cuerpo JSON con una geometria GeoJSON"
+            }), 400
+        
+        geometry = body.get('geometry', body)
+        mode = body.get('mode', request.args.get('mode', 'rows'))
+        
+        if mode not in ('rows', 'count', 'stats'):
+            return jsonify({
+                "success": False,
+                "error": "Modo invalido: rows, count o stats"
+            }), 400
+        
+        try:
+            polygons = parse_geojson_polygons(geometry)
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 400
+        
+        lat_min, lat_max, lon_min, lon_max = polygons_bounds(polygons)
+        response = {
+            "success": True,
+            "mode": mode,
+            "bbox": {
+                "lat_min": lat_min,
+                "lat_max": lat_max,
+                "lon_min": lon_min,
+                "lon_max": lon_max
+            }
+        }
+        
+        if mode == 'count':
+            response["count"] = db.trees.count_trees_within(polygons)
+        elif mode == 'stats':
+            stats = db.trees.get_stats_within(polygons)
+            response["count"] = stats["total_trees"]
+            response["data"] = stats
+        else:
+            result = db.trees.get_trees_within(polygons, page=page, per_page=per_page)
+            response.update({
+                "page": result["page"],
+                "per_page": result["per_page"],
+                "total": result["total"],
+                "total_pages": result["total_pages"],
+                "count": len(result["trees"]),
+                "data": result["trees"]
+            })
+        
+        return jsonify(response)
+    
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+# ============================================
+# ENDPOINTS DE INGESTA
+# ============================================
+
+# Segundos maximos de espera en modo wait antes de responder 202. Debe quedar
+# bien por debajo del timeout de los workers de Gunicorn (30 s por defecto),
+# si no, un grupo lento (cola llena o bloqueo de escritura ocupado) mata al worker.
+DETECTIONS_WAIT_TIMEOUT = float(os.getenv('DETECTIONS_WAIT_TIMEOUT', 10))
+
+
+@api_bp.route('/detections', methods=['POST'])
+def post_detections():
+    """
+    POST /api/detections?wait=false - Ingesta por lotes de imagenes con sus cajas YOLO.
+    Sin wait responde 202 al encolar; con wait=true responde 201 cuando el lote
+    esta confirmado en disco. Responde 429 si la cola de escritura esta llena.
+    """
+    try:
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            return jsonify({
+                "success": False,
+                "error": "Se requiere un cuerpo JSON con una lista 'images'"
+            }), 400
+        
+        wait = body.get('wait', request.args.get('wait', 'false'))
+        if not isinstance(wait, bool):
+            wait = str(wait).lower() == 'true'
+        
+        try:
+            batch = prepare_detection_batch(body, db.species.get_species_ids())
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 400
+        
+        try:
+            ticket = db.detections.submit(batch)
+        except queue.Full:
+            response = jsonify({
+                "success": False,
+                "error": "Cola de escritura llena, reintentar mas tarde."
+            })
+            response.headers['Retry-After'] = '1'
+            return response, 429
+        
+        if not wait or not ticket.wait(DETECTIONS_WAIT_TIMEOUT):
+            return jsonify({
+                "success": True,
+                "status": "accepted",
+                "images": len(batch),
+                "detections": ticket.detections,
+                "queue_size": db.detections.queue_size
+            }), 202
+        
+        if ticket.error is not None:
+            return jsonify({
+                "success": False,
+                "error": str(ticket.error)
+            }), 500
+        
+        return jsonify({
+            "success": True,
+            "status": "committed",
+            "images": ticket.result["images"],
+            "skipped": ticket.result["skipped"],
+            "detections": ticket.result["detections"]
+        }), 201
+    
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
 # ============================================
 # ENDPOINTS DE IMAGENES
 # ============================================
@@ -190,6 +514,89 @@ def get_images():
         }), 500
 
 
+@api_bp.route('/images/covering', methods=['GET'])
+def get_images_covering_point():
+    """
+    GET /api/images/covering?lat=9.935&lon=-84.09
+    Retorna las imagenes que cubren un punto (centro mas cercano primero).
+    """
+    try:
+        lat = request.args.get('lat', type=float)
+        lon = request.args.get('lon', type=float)
+        
+        # Validar parametros requeridos
+        if lat is None or lon is None:
+            return jsonify({
+                "success": False,
+                "error": "Parametros requeridos: lat, lon"
+            }), 400
+        
+        images = db.images.get_images_covering_point(lat, lon)
+        
+        return jsonify({
+            "success": True,
+            "point": {
+                "lat": lat,
+                "lon": lon
+            },
+            "count": len(images),
+            "data": images
+        })
+    
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+@api_bp.route('/images/covering/area', methods=['GET'])
+def get_images_covering_area():
+    """
+    GET /api/images/covering/area?lat_min=9.93&lat_max=9.94&lon_min=-84.09&lon_max=-84.08
+    Retorna las imagenes cuya huella se intersecta con un area.
+    """
+    try:
+        lat_min = request.args.get('lat_min', type=float)
+        lat_max = request.args.get('lat_max', type=float)
+        lon_min = request.args.get('lon_min', type=float)
+        lon_max = request.args.get('lon_max', type=float)
+        
+        # Validar parametros requeridos
+        if None in (lat_min, lat_max, lon_min, lon_max):
+            return jsonify({
+                "success": False,
+                "error": "Parametros requeridos: lat_min, lat_max, lon_min, lon_max"
+            }), 400
+        
+        # Validar rangos logicos
+        if lat_min >= lat_max or lon_min >= lon_max:
+            return jsonify({
+                "success": False,
+                "error": "Rangos invalidos: lat_min < lat_max y lon_min < lon_max"
+            }), 400
+        
+        images = db.images.get_images_covering_area(lat_min, lat_max, lon_min, lon_max)
+        
+        return jsonify({
+            "success": True,
+            "area": {
+                "lat_min": lat_min,
+                "lat_max": lat_max,
+                "lon_min": lon_min,
+                "lon_max": lon_max
+            },
+            "count": len(images),
+            "data": images
+        })
+    
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
 # ============================================
 # ENDPOINTS DE ESTADISTICAS
 # ============================================
@@ -224,10 +631,16 @@ def api_info():
             "especies": "/api/species",
             "todos_los_arboles": "/api/trees",
             "arboles_paginados": "/api/trees?page=1&per_page=50",
+            "arboles_filtrados": "/api/trees?min_confidence=0.8&min_height=10&species_id=1,2&sort=-confidence",
             "arbol_por_id": "/api/trees/{id}",
             "arboles_por_especie": "/api/trees/species/{species_id}",
             "imagenes": "/api/images",
+            "imagenes_que_cubren_punto": "/api/images/covering?lat=9.935&lon=-84.09",
+            "imagenes_que_cubren_area": "/api/images/covering/area?lat_min=9.93&lat_max=9.94&lon_min=-84.09&lon_max=-84.08",
             "estadisticas": "/api/stats",
-            "buscar_area": "/api/trees/area?lat_min=9.93&lat_max=9.94&lon_min=-84.09&lon_max=-84.08"
+            "buscar_area": "/api/trees/area?lat_min=9.93&lat_max=9.94&lon_min=-84.09&lon_max=-84.08",
+            "ingesta_detecciones": "POST /api/detections?wait=true {images: [{filename, gps_center_lat, gps_center_lon, detections: [{species_id, bbox, confidence}]}]}",
+            "clusters_mapa": "/api/trees/clusters?zoom=14&bbox=-84.10,9.92,-84.07,9.95",
+            "buscar_poligono": "POST /api/trees/within?page=1&per_page=50 {geometry: GeoJSON Polygon/MultiPolygon, mode: rows|count|stats}"
         }
     })
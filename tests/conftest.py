@@ -0,0 +1,103 @@
+# tests/conftest.py
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# Agregar la raiz del proyecto al path para imports (igual que run.py)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.api.database import DatabaseManager
+from src.api.database.schema import create_schema
+
+# test_api.py es un script de humo que necesita el servidor corriendo en localhost:5000
+collect_ignore = ["test_api.py"]
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """
+    Base de datos temporal con el esquema completo y datos de ejemplo.
+    """
+    path = str(tmp_path / "tree_detection.db")
+    conn = sqlite3.connect(path)
+    create_schema(conn)
+
+    conn.executemany(
+        "INSERT INTO species (species_id, common_name, scientific_name) VALUES (?, ?, ?)",
+        [(1, "Ceiba", "Ceiba pentandra"), (2, "Guanacaste", "Enterolobium cyclocarpum"),
+         (3, "Almendro", "Dipteryx panamensis")]
+    )
+    conn.executemany(
+        """INSERT INTO images (filename, gps_center_lat, gps_center_lon, processing_date)
+        VALUES (?, ?, ?, ?)""",
+        [("img_001.jpg", 9.9350, -84.0900, "2025-01-10"),
+         ("img_002.jpg", 9.9360, -84.0910, "2025-02-10")]
+    )
+    trees = []
+    for i in range(60):
+        trees.append((
+            (i % 2) + 1,                 # image_id
+            (i % 3) + 1,                 # species_id
+            0.5, 0.5, 0.1, 0.1,          # bbox
+            9.9350 + i * 0.0001,         # gps_lat
+            -84.0900 - i * 0.0001,       # gps_lon
+            0.40 + i * 0.01,             # detection_confidence
+            5.0 + i * 0.5,               # estimated_height_m
+            2.0 + i * 0.2,               # estimated_crown_diameter_m
+            f"2025-{(i % 12) + 1:02d}-15T10:00:00"
+        ))
+    conn.executemany(
+        """INSERT INTO trees
+        (image_id, species_id, bbox_x_center, bbox_y_center, bbox_width, bbox_height,
+         gps_lat, gps_lon, detection_confidence, estimated_height_m, estimated_crown_diameter_m,
+         detection_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        trees
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def db(db_path):
+    return DatabaseManager(db_path)
+
+
+@pytest.fixture
+def make_payload():
+    """
+    Generador de cuerpos para POST /api/detections.
+    """
+    def make(prefix: str, n_images: int = 2, n_detections: int = 3):
+        return {
+            "images": [
+                {
+                    "filename": f"{prefix}_{i}.jpg",
+                    "gps_center_lat": 9.95,
+                    "gps_center_lon": -84.10,
+                    "detections": [
+                        {"species_id": 1, "bbox": [0.5, 0.25, 0.1, 0.1], "confidence": 0.9,
+                         "estimated_height_m": 12.0}
+                        for _ in range(n_detections)
+                    ],
+                }
+                for i in range(n_images)
+            ]
+        }
+    return make
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    """
+    Cliente de pruebas de Flask con las rutas apuntando a la base temporal.
+    """
+    from src.api import routes
+    from src.api.app import create_app
+
+    monkeypatch.setattr(routes, "db", db)
+    yield create_app().test_client()
+    db.detections.close()
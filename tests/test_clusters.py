@@ -0,0 +1,96 @@
+# tests/test_clusters.py
+import sqlite3
+
+import pytest
+
+from src.api.database.clusters import MAX_CLUSTER_ZOOM, MAX_FEATURES
+from src.api.database.writer import prepare_detection_batch
+
+
+def cluster_rows(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("""
+            SELECT zoom, cell_x, cell_y, species_id, tree_count,
+                   ROUND(sum_lat, 9), ROUND(sum_lon, 9)
+            FROM tree_clusters ORDER BY zoom, cell_x, cell_y, species_id
+        """).fetchall()
+    finally:
+        conn.close()
+
+
+def test_build_levels_are_consistent(db, db_path):
+    rows_per_zoom = db.clusters.build()
+
+    assert set(rows_per_zoom) == set(range(MAX_CLUSTER_ZOOM + 1))
+    totals = {}
+    for zoom, _, _, _, count, _, _ in cluster_rows(db_path):
+        totals[zoom] = totals.get(zoom, 0) + count
+    assert set(totals.values()) == {60}
+
+
+def test_world_view_is_one_cluster_with_species_breakdown(db):
+    db.clusters.build()
+
+    result = db.clusters.get_clusters(0, -180, -85, 180, 85)
+    cluster = result["clusters"][0]
+
+    assert result["cluster_zoom"] == 0
+    assert len(result["clusters"]) == 1
+    assert cluster["count"] == 60
+    assert sorted((s["species_id"], s["count"]) for s in cluster["species"]) == [(1, 20), (2, 20), (3, 20)]
+    assert cluster["lat"] == pytest.approx(9.9350 + 59 * 0.0001 / 2)
+    assert cluster["lon"] == pytest.approx(-84.0900 - 59 * 0.0001 / 2)
+
+
+def test_large_bbox_at_high_zoom_is_capped(db):
+    db.clusters.build()
+
+    result = db.clusters.get_clusters(16, -84.2, 9.8, -84.0, 10.0)
+
+    assert result["cluster_zoom"] < 16
+    assert 0 < len(result["clusters"]) <= MAX_FEATURES
+    assert sum(c["count"] for c in result["clusters"]) == 60
+
+
+def test_ingestion_refreshes_touched_tiles(db, db_path, make_payload):
+    db.clusters.build()
+
+    ticket = db.detections.submit(prepare_detection_batch(make_payload("cluster", n_images=2)))
+    assert ticket.wait(10) and ticket.error is None
+    db.detections.close()
+    incremental = cluster_rows(db_path)
+
+    db.clusters.build()
+
+    assert incremental == cluster_rows(db_path)
+    assert db.clusters.get_clusters(0, -180, -85, 180, 85)["clusters"][0]["count"] == 66
+
+
+def test_ingestion_before_build_leaves_index_empty(db, make_payload):
+    ticket = db.detections.submit(prepare_detection_batch(make_payload("nobuild", n_images=1)))
+    assert ticket.wait(10) and ticket.error is None
+    db.detections.close()
+
+    assert not db.clusters.is_built()
+
+
+def test_cluster_hook_error_fails_only_its_batch(db, db_path, make_payload):
+    # species_id -1 existe en species pero esta fuera de rango para el indice
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO species (species_id, common_name, scientific_name) VALUES (-1, 'X', 'X')")
+    conn.commit()
+    conn.close()
+    db.clusters.build()
+
+    bad_payload = make_payload("bad", n_images=1)
+    for detection in bad_payload["images"][0]["detections"]:
+        detection["species_id"] = -1
+    good = db.detections.submit(prepare_detection_batch(make_payload("good", n_images=1)))
+    bad = db.detections.submit(prepare_detection_batch(bad_payload))
+
+    assert good.wait(10) and bad.wait(10)
+    assert good.error is None and isinstance(bad.error, ValueError)
+    assert db.detections._thread.is_alive()
+    db.detections.close()
+    assert db.trees.get_total_trees_count() == 60 + 3
@@ -0,0 +1,58 @@
+# tests/test_geometry.py
+import numpy as np
+import pytest
+
+from src.api.geometry import parse_geojson_polygons, points_in_polygons, polygons_bounds
+
+SQUARE_WITH_HOLE = {
+    "type": "Polygon",
+    "coordinates": [
+        [[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]],
+        [[4, 4], [6, 4], [6, 6], [4, 6], [4, 4]],
+    ],
+}
+
+
+def test_points_in_polygon_with_hole():
+    polygons = parse_geojson_polygons(SQUARE_WITH_HOLE)
+    lon = np.array([1.0, 5.0, 9.5, 11.0, 5.0])
+    lat = np.array([1.0, 5.0, 9.5, 5.0, 3.0])
+
+    assert points_in_polygons(lon, lat, polygons).tolist() == [True, False, True, False, True]
+
+
+def test_points_in_multipolygon_and_concave_shape():
+    multipolygon = {
+        "type": "MultiPolygon",
+        "coordinates": [
+            # Forma de "U": el punto (5, 8) cae en la muesca
+            [[[0, 0], [10, 0], [10, 10], [7, 10], [7, 3], [3, 3], [3, 10], [0, 10]]],
+            [[[20, 20], [22, 20], [22, 22], [20, 22], [20, 20]]],
+        ],
+    }
+    polygons = parse_geojson_polygons(multipolygon)
+    lon = np.array([1.0, 5.0, 8.0, 21.0, 15.0])
+    lat = np.array([8.0, 8.0, 8.0, 21.0, 15.0])
+
+    assert points_in_polygons(lon, lat, polygons).tolist() == [True, False, True, True, False]
+    assert polygons_bounds(polygons) == (0.0, 22.0, 0.0, 22.0)
+
+
+def test_parse_accepts_feature_and_closes_rings():
+    feature = {"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [[[0, 0], [1, 0], [1, 1]]]}}
+    ring = parse_geojson_polygons(feature)[0][0]
+
+    assert ring.shape == (4, 2)
+    assert ring[0].tolist() == ring[-1].tolist()
+
+
+@pytest.mark.parametrize("geometry", [
+    {"type": "Point", "coordinates": [0, 0]},
+    {"type": "Polygon", "coordinates": []},
+    {"type": "Polygon", "coordinates": [[[0, 0], [1, 1]]]},
+    {"type": "Polygon", "coordinates": [[[0, 0], [200, 0], [0, 1], [0, 0]]]},
+    {"type": "Polygon", "coordinates": [[["a", 0], [1, 0], [0, 1]]]},
+])
+def test_parse_rejects_invalid_geometry(geometry):
+    with pytest.raises(ValueError):
+        parse_geojson_polygons(geometry)
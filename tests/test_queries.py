@@ -0,0 +1,238 @@
+# tests/test_queries.py
+import itertools
+import sqlite3
+
+import pytest
+
+from src.api.database import DatabaseManager
+from src.api.database.schema import TABLES, ensure_indexes, missing_schema_objects
+from src.api.geometry import bbox_to_gps, parse_geojson_polygons
+
+# Un valor representativo por filtro soportado en /api/trees
+FILTER_VALUES = {
+    "min_confidence": 0.5,
+    "min_height": 10.0,
+    "max_height": 30.0,
+    "min_crown_diameter": 3.0,
+    "max_crown_diameter": 12.0,
+    "species_ids": [1, 2],
+    "image_id": 1,
+    "date_from": "2025-03-01",
+    "date_to": "2025-09-30",
+}
+
+SORT_KEYS = ["tree_id", "-tree_id", "confidence", "-height", "crown_diameter", "-detection_date"]
+
+
+def query_plan(db_path, sql, params):
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+    finally:
+        conn.close()
+
+
+def test_filter_combinations_use_indexes(db, db_path):
+    for size in range(1, len(FILTER_VALUES) + 1):
+        for names in itertools.combinations(FILTER_VALUES, size):
+            filters = {name: FILTER_VALUES[name] for name in names}
+            for sort in SORT_KEYS:
+                (count_sql, count_params), (page_sql, page_params) = \
+                    db.trees.build_search_queries(filters, sort)
+
+                for sql, params in ((count_sql, count_params), (page_sql, page_params + [50, 0])):
+                    plan = query_plan(db_path, sql, params)
+                    tree_steps = [step for step in plan if step.startswith(("SCAN t", "SEARCH t"))]
+                    assert tree_steps, plan
+                    assert all(step.startswith("SEARCH t") for step in tree_steps), \
+                        f"{names} sort={sort}: {plan}"
+
+
+def test_search_trees_matches_python_filter(db):
+    result = db.trees.search_trees(
+        {"min_confidence": 0.6, "max_height": 30.0, "species_ids": [1, 3]},
+        sort="-confidence", per_page=100
+    )
+    trees = result["trees"]
+
+    assert result["total"] == len(trees) > 0
+    assert all(t["detection_confidence"] >= 0.6 for t in trees)
+    assert all(t["estimated_height_m"] <= 30.0 for t in trees)
+    assert all(t["species_id"] in (1, 3) for t in trees)
+    confidences = [t["detection_confidence"] for t in trees]
+    assert confidences == sorted(confidences, reverse=True)
+
+
+def test_search_trees_date_to_includes_whole_day(db):
+    result = db.trees.search_trees({"date_from": "2025-03-15", "date_to": "2025-03-15"})
+
+    assert result["total"] == 5
+    assert all(t["detection_date"].startswith("2025-03-15") for t in result["trees"])
+
+
+def test_search_trees_without_filters_paginates(db):
+    result = db.trees.search_trees(page=2, per_page=25)
+
+    assert result["total"] == 60
+    assert result["total_pages"] == 3
+    assert [t["tree_id"] for t in result["trees"]] == list(range(26, 51))
+
+
+@pytest.mark.parametrize("sort", ["gps_lat; DROP TABLE trees", "--confidence", "---height"])
+def test_search_trees_rejects_unknown_sort(db, sort):
+    with pytest.raises(ValueError):
+        db.trees.search_trees(sort=sort)
+
+
+def test_trees_within_polygon_modes_agree(db):
+    # Rectangulo con un hueco en el centro, en grados (lon, lat); los bordes
+    # quedan a mitad de camino entre arboles para evitar casos de frontera
+    geometry = {
+        "type": "Polygon",
+        "coordinates": [
+            [[-84.09555, 9.93545], [-84.08995, 9.93545], [-84.08995, 9.94055], [-84.09555, 9.94055]],
+            [[-84.09395, 9.93705], [-84.09205, 9.93705], [-84.09205, 9.93895], [-84.09395, 9.93895]],
+        ],
+    }
+    polygons = parse_geojson_polygons(geometry)
+
+    trees = db.trees.get_trees_within(polygons, per_page=100)["trees"]
+    count = db.trees.count_trees_within(polygons)
+    stats = db.trees.get_stats_within(polygons)
+
+    all_trees = db.trees.search_trees(per_page=100)["trees"]
+    expected = [
+        t["tree_id"] for t in all_trees
+        if 9.93545 < t["gps_lat"] < 9.94055 and -84.09555 < t["gps_lon"] < -84.08995
+        and not (9.93705 < t["gps_lat"] < 9.93895 and -84.09395 < t["gps_lon"] < -84.09205)
+    ]
+
+    assert [t["tree_id"] for t in trees] == expected
+    assert count == stats["total_trees"] == len(expected) > 0
+    assert sum(s["count"] for s in stats["species_distribution"]) == count
+    inside = [t for t in all_trees if t["tree_id"] in set(expected)]
+    assert stats["height_stats"]["max_height_m"] == round(max(t["estimated_height_m"] for t in inside), 2)
+
+
+def test_trees_within_paginates_by_tree_id(db):
+    polygons = parse_geojson_polygons(
+        {"type": "Polygon", "coordinates": [[[-85, 9], [-84, 9], [-84, 10], [-85, 10]]]}
+    )
+
+    first = db.trees.get_trees_within(polygons, page=1, per_page=25)
+    last = db.trees.get_trees_within(polygons, page=3, per_page=25)
+
+    assert first["total"] == last["total"] == 60
+    assert first["total_pages"] == 3
+    assert [t["tree_id"] for t in first["trees"]] == list(range(1, 26))
+    assert [t["tree_id"] for t in last["trees"]] == list(range(51, 61))
+
+
+def test_stats_within_empty_polygon(db):
+    polygons = parse_geojson_polygons(
+        {"type": "Polygon", "coordinates": [[[0, 0], [1, 0], [1, 1], [0, 1]]]}
+    )
+
+    stats = db.trees.get_stats_within(polygons)
+
+    assert stats["total_trees"] == 0
+    assert stats["species_distribution"] == []
+    assert stats["confidence_stats"]["avg_confidence"] is None
+
+
+def test_images_covering_point_uses_footprint_index(db, db_path):
+    # img_001 centrado en (9.9350, -84.0900); img_002 en (9.9360, -84.0910)
+    images = db.images.get_images_covering_point(9.9352, -84.0902)
+
+    assert [image["filename"] for image in images] == ["img_001.jpg", "img_002.jpg"]
+    assert images[0]["lat_min"] < 9.9352 < images[0]["lat_max"]
+    assert db.images.get_images_covering_point(10.5, -84.0900) == []
+
+    plan = query_plan(db_path, "SELECT image_id FROM image_footprints "
+                               "WHERE min_lat <= ? AND max_lat >= ? AND min_lon <= ? AND max_lon >= ?",
+                      (9.9352, 9.9352, -84.0902, -84.0902))
+    assert any("VIRTUAL TABLE INDEX" in step for step in plan), plan
+
+
+def test_images_covering_point_orders_by_ground_distance(db, db_path):
+    # A 60 grados un grado de longitud mide la mitad: north esta a 0.0010 grados
+    # de latitud y east a 0.0015 de longitud (0.00075 en tierra), east va primero
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO images (filename, gps_center_lat, gps_center_lon) VALUES (?, ?, ?)",
+                     [("north.jpg", 60.0010, 10.0), ("east.jpg", 60.0, 10.0015)])
+    conn.commit()
+    conn.close()
+
+    images = db.images.get_images_covering_point(60.0, 10.0)
+
+    assert [image["filename"] for image in images] == ["east.jpg", "north.jpg"]
+
+
+def test_image_footprints_follow_inserts_updates_and_deletes(db, db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("""INSERT INTO images (filename, gps_center_lat, gps_center_lon, meters_per_pixel)
+                    VALUES ('img_003.jpg', 10.0, -85.0, 0.5)""")
+    conn.execute("UPDATE images SET gps_center_lat = 11.0 WHERE filename = 'img_001.jpg'")
+    conn.execute("DELETE FROM images WHERE filename = 'img_002.jpg'")
+    conn.commit()
+    conn.close()
+
+    # 640 px * 0.5 m / 2 = 160 m al norte del centro
+    assert [i["filename"] for i in db.images.get_images_covering_point(10.0014, -85.0)] == ["img_003.jpg"]
+    assert db.images.get_images_covering_point(10.0015, -85.0) == []
+    assert [i["filename"] for i in db.images.get_images_covering_point(11.0, -84.0900)] == ["img_001.jpg"]
+    assert db.images.get_images_covering_area(9.93, 9.94, -84.10, -84.08) == []
+
+
+def test_image_footprint_triggers_need_no_math_functions(db_path):
+    def unavailable(_):
+        raise RuntimeError("no such function")
+
+    # Simula un SQLite sin funciones matematicas (otro proceso que inserta imagenes)
+    conn = sqlite3.connect(db_path)
+    conn.create_function("cos", 1, unavailable)
+    conn.create_function("radians", 1, unavailable)
+    conn.execute("""INSERT INTO images (filename, gps_center_lat, gps_center_lon)
+                    VALUES ('img_003.jpg', 45.0, -75.0)""")
+    conn.commit()
+    lat_min, lat_max, lon_min, lon_max = conn.execute("""
+        SELECT lat_min, lat_max, lon_min, lon_max FROM image_footprints
+        WHERE image_id = (SELECT image_id FROM images WHERE filename = 'img_003.jpg')
+    """).fetchone()
+
+    # Un trigger con la definicion anterior se reporta para que migrate.py lo recree
+    conn.execute("DROP TRIGGER trg_images_footprint_insert")
+    conn.execute("""CREATE TRIGGER trg_images_footprint_insert AFTER INSERT ON images
+                    BEGIN SELECT cos(radians(NEW.gps_center_lat)); END""")
+    assert missing_schema_objects(conn) == ["trg_images_footprint_insert"]
+    ensure_indexes(conn)
+    assert missing_schema_objects(conn) == []
+    conn.close()
+
+    lats, lons = bbox_to_gps([0.0, 1.0], [1.0, 0.0], 45.0, -75.0)
+    assert (lat_min, lat_max) == pytest.approx(tuple(lats), abs=1e-12)
+    assert (lon_min, lon_max) == pytest.approx(tuple(lons), abs=1e-12)
+
+
+def test_image_footprints_backfilled_for_existing_database(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(path)
+    for statement in TABLES:
+        conn.execute(statement)
+    conn.execute("""INSERT INTO images (filename, gps_center_lat, gps_center_lon)
+                    VALUES ('legacy.jpg', 9.9350, -84.0900)""")
+    conn.execute("CREATE INDEX idx_trees_species ON trees(species_id)")
+    conn.commit()
+
+    # Al arrancar solo se reporta lo que falta; los indices los crea migrate.py
+    db = DatabaseManager(path)
+    assert "idx_trees_confidence" in db.missing_schema
+    assert "idx_trees_confidence" in missing_schema_objects(conn)
+    assert "idx_trees_species" in db.missing_schema
+
+    ensure_indexes(conn)
+    conn.close()
+
+    assert DatabaseManager(path).missing_schema == []
+    assert [i["filename"] for i in db.images.get_images_covering_area(9.934, 9.936, -84.091, -84.089)] \
+        == ["legacy.jpg"]
@@ -0,0 +1,119 @@
+# tests/test_routes.py
+import json
+
+import pytest
+
+
+def test_trees_date_filter_normalizes_compact_iso(client):
+    compact = client.get("/api/trees?date_to=20250301&per_page=100").get_json()
+    extended = client.get("/api/trees?date_to=2025-03-01&per_page=100").get_json()
+
+    assert compact["filters"]["date_to"] == "2025-03-01"
+    assert compact["total"] == extended["total"] == 10
+    assert all(t["detection_date"] < "2025-03-02" for t in compact["data"])
+
+
+@pytest.mark.parametrize("query", ["min_height=nan", "max_crown_diameter=inf", "min_confidence=-Infinity"])
+def test_trees_rejects_non_finite_numbers(client, query):
+    response = client.get(f"/api/trees?{query}")
+
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False
+
+
+def test_trees_rejects_repeated_sort_prefix(client):
+    assert client.get("/api/trees?sort=-confidence").status_code == 200
+    assert client.get("/api/trees?sort=--confidence").status_code == 400
+
+
+def test_trees_within_rows_are_paginated(client):
+    geometry = {"type": "Polygon", "coordinates": [[[-85, 9], [-84, 9], [-84, 10], [-85, 10]]]}
+
+    body = client.post("/api/trees/within?per_page=25&page=3", json={"geometry": geometry}).get_json()
+
+    assert (body["total"], body["total_pages"], body["count"]) == (60, 3, 10)
+    assert client.post("/api/trees/within?per_page=101", json={"geometry": geometry}).status_code == 400
+
+
+def test_detections_accepted_then_committed(client, db, make_payload):
+    # "false" en el cuerpo es falso, igual que ?wait=false
+    accepted = client.post("/api/detections", json=dict(make_payload("async"), wait="false"))
+    committed = client.post("/api/detections?wait=true", json=make_payload("sync"))
+
+    assert accepted.status_code == 202
+    assert accepted.get_json()["status"] == "accepted"
+    assert committed.status_code == 201
+    assert [image["filename"] for image in committed.get_json()["images"]] == ["sync_0.jpg", "sync_1.jpg"]
+
+    db.detections.close()
+    assert db.trees.get_total_trees_count() == 60 + 12
+
+
+def test_detections_queue_full_returns_429(client, db, make_payload, monkeypatch):
+    from src.api.database.writer import DetectionWriter
+
+    monkeypatch.setattr(db, "detections", DetectionWriter(db.connection, max_queue_batches=1, autostart=False))
+
+    assert client.post("/api/detections", json=make_payload("q0")).status_code == 202
+    response = client.post("/api/detections", json=make_payload("q1"))
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_detections_rejects_unknown_species(client, db, make_payload):
+    payload = make_payload("unknown", n_images=1, n_detections=1)
+    payload["images"][0]["detections"][0]["species_id"] = 99
+
+    response = client.post("/api/detections?wait=true", json=payload)
+
+    assert response.status_code == 400
+    assert "species_id 99" in response.get_json()["error"]
+    assert db.trees.get_total_trees_count() == 60
+
+
+@pytest.mark.parametrize("query", ["species_id=99999999999999999999", "image_id=99999999999999999999",
+                                   "species_id=" + ",".join(str(i) for i in range(101))])
+def test_trees_rejects_out_of_range_ids(client, query):
+    assert client.get(f"/api/trees?{query}").status_code == 400
+
+
+def test_trees_deduplicates_species_ids(client):
+    body = client.get("/api/trees?species_id=1,1&species_id=1").get_json()
+
+    assert body["filters"]["species_ids"] == [1]
+
+
+def test_trees_date_to_without_time_includes_whole_day(client):
+    body = client.get("/api/trees?date_from=2025-03-15T10:00&date_to=2025-03-15").get_json()
+
+    assert body["success"] is True
+    assert body["total"] == 5
+    assert client.get("/api/trees?date_from=2025-03-16&date_to=2025-03-15").status_code == 400
+
+
+@pytest.mark.parametrize("field, raw_value", [
+    ("width", "1e20"), ("width", "1e400"), ("height", "Infinity"), ("height", "true"),
+    ("width", "640.5"), ("species_id", "99999999999999999999"),
+])
+def test_detections_rejects_unstorable_values_before_accepting(client, db, make_payload, field, raw_value):
+    # Sin wait la respuesta seria 202 y el lote se perderia en el escritor
+    payload = make_payload("unstorable", n_images=1, n_detections=1)
+    target = payload["images"][0]["detections"][0] if field == "species_id" else payload["images"][0]
+    target[field] = "__VALUE__"
+    body = json.dumps(payload).replace('"__VALUE__"', raw_value)
+
+    response = client.post("/api/detections", data=body, content_type="application/json")
+
+    assert response.status_code == 400
+    assert field in response.get_json()["error"]
+    db.detections.close()
+    assert db.trees.get_total_trees_count() == 60
+
+
+@pytest.mark.parametrize("bbox", ["nan,nan,nan,nan", "-84.1,9.9,inf,10.0", "-84.1,9.9,-84.0"])
+def test_clusters_rejects_invalid_bbox(client, db, bbox):
+    db.clusters.build()
+
+    assert client.get(f"/api/trees/clusters?zoom=14&bbox={bbox}").status_code == 400
+    assert client.get("/api/trees/clusters?zoom=14&bbox=-84.1,9.9,-84.0,10.0").status_code == 200
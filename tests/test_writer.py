@@ -0,0 +1,113 @@
+# tests/test_writer.py
+import queue
+
+import pytest
+
+from src.api.database import writer as writer_module
+from src.api.database.writer import DetectionWriter, prepare_detection_batch
+
+
+def test_prepare_batch_converts_yolo_boxes_to_gps(make_payload):
+    batch = prepare_detection_batch(make_payload("gps", n_images=1, n_detections=1))
+    tree = batch[0]["tree_rows"][0]
+
+    # y_center = 0.25 -> 160 px al norte del centro (640 px, 0.78 m/px)
+    assert tree[5] == pytest.approx(9.95 + 160 * 0.78 / 111320)
+    assert tree[6] == pytest.approx(-84.10)
+    assert batch[0]["image_row"][-1] == 1
+
+
+@pytest.mark.parametrize("payload", [
+    {},
+    {"images": []},
+    {"images": [{"filename": "x.jpg", "gps_center_lat": 9.9}]},
+    {"images": [{"filename": "x.jpg", "gps_center_lat": 9.9, "gps_center_lon": -84.0,
+                 "detections": [{"species_id": 1, "bbox": [1.5, 0.5, 0.1, 0.1], "confidence": 0.9}]}]},
+])
+def test_prepare_batch_rejects_invalid_payload(payload):
+    with pytest.raises(ValueError):
+        prepare_detection_batch(payload)
+
+
+@pytest.mark.parametrize("image_fields, detection_fields", [
+    ({}, {"species_id": 99}),
+    ({}, {"estimated_height_m": "NaN"}),
+    ({}, {"estimated_crown_diameter_m": float("inf")}),
+    ({"processing_date": {"year": 2025}}, {}),
+    ({"detection_date": "15/03/2025"}, {}),
+])
+def test_prepare_batch_rejects_invalid_values(make_payload, image_fields, detection_fields):
+    payload = make_payload("bad", n_images=1, n_detections=1)
+    payload["images"][0].update(image_fields)
+    payload["images"][0]["detections"][0].update(detection_fields)
+
+    with pytest.raises(ValueError):
+        prepare_detection_batch(payload, species_ids={1, 2, 3})
+
+
+def test_prepare_batch_normalizes_dates(make_payload):
+    payload = make_payload("dates", n_images=1, n_detections=1)
+    payload["images"][0].update({"processing_date": "20250301", "detection_date": "2025-03-01T10:00"})
+
+    image = prepare_detection_batch(payload, species_ids={1})[0]
+
+    assert image["image_row"][7] == "2025-03-01"
+    assert image["tree_rows"][0][-1] == "2025-03-01T10:00:00"
+
+
+def test_writer_group_commits_queued_batches(db, make_payload):
+    writer = DetectionWriter(db.connection, autostart=False)
+    # El hook corre una vez por transaccion con todos los lotes del grupo
+    transactions = []
+    writer.add_commit_hook(lambda conn, batches: transactions.append(len(batches)))
+    tickets = [writer.submit(prepare_detection_batch(make_payload(f"b{i}"))) for i in range(5)]
+
+    writer.start()
+    assert all(ticket.wait(10) for ticket in tickets)
+    writer.close()
+
+    assert transactions == [5]
+    assert all(ticket.error is None for ticket in tickets)
+    assert sum(ticket.result["detections"] for ticket in tickets) == 30
+    assert db.trees.get_total_trees_count() == 60 + 30
+    image = db.images.get_images_covering_point(9.95, -84.10)[0]
+    assert image["total_trees_detected"] == 3
+
+
+def test_writer_skips_existing_images(db, make_payload):
+    writer = DetectionWriter(db.connection)
+    first = writer.submit(prepare_detection_batch(make_payload("dup", n_images=1)))
+    second = writer.submit(prepare_detection_batch(make_payload("dup", n_images=1)))
+
+    assert first.wait(10) and second.wait(10)
+    writer.close()
+
+    assert [image["filename"] for image in first.result["images"]] == ["dup_0.jpg"]
+    assert second.result["skipped"] == ["dup_0.jpg"]
+    assert db.trees.get_total_trees_count() == 60 + 3
+
+
+def test_writer_queue_full_raises(db, make_payload):
+    writer = DetectionWriter(db.connection, max_queue_batches=2, autostart=False)
+    writer.submit(prepare_detection_batch(make_payload("q0")))
+    writer.submit(prepare_detection_batch(make_payload("q1")))
+
+    with pytest.raises(queue.Full):
+        writer.submit(prepare_detection_batch(make_payload("q2")))
+
+
+@pytest.mark.skipif(writer_module.fcntl is None, reason="requiere fcntl (POSIX)")
+def test_writer_waits_for_other_process_lock(db, db_path, make_payload):
+    # Otro proceso (worker de Gunicorn) con el bloqueo de escritura tomado
+    lock_file = open(db_path + "-writer.lock", "a")
+    writer_module.fcntl.flock(lock_file.fileno(), writer_module.fcntl.LOCK_EX)
+
+    writer = DetectionWriter(db.connection)
+    ticket = writer.submit(prepare_detection_batch(make_payload("locked", n_images=1)))
+    assert not ticket.wait(0.5)
+
+    writer_module.fcntl.flock(lock_file.fileno(), writer_module.fcntl.LOCK_UN)
+    lock_file.close()
+    assert ticket.wait(10)
+    writer.close()
+    assert ticket.result["detections"] == 3